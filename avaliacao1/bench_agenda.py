@@ -0,0 +1,42 @@
+import sys
+import time
+from datetime import datetime
+from ms_leilao import montar_agenda, rodar_agenda, gerar_leiloes, FORMATO_TIME
+
+# Atraso de disparo do loop de eventos do ms_leilao com muitos leilões (sem
+# RabbitMQ: o disparo só anota o atraso), e quanto custava cada volta do loop
+# antigo, que relia inicio/fim de todos os leilões com strptime a cada segundo.
+# Uso: python bench_agenda.py [leiloes]
+
+
+def varredura_antiga(agenda):
+    agora = datetime.now()
+    inicio = time.perf_counter()
+    for _, _, _, leilao in agenda:
+        datetime.strptime(leilao["inicio"], FORMATO_TIME) <= agora
+        datetime.strptime(leilao["fim"], FORMATO_TIME) <= agora
+    return time.perf_counter() - inicio
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    inicio = time.perf_counter()
+    agenda = montar_agenda(gerar_leiloes(n))
+    montagem = time.perf_counter() - inicio
+    #cada leilão tem dois eventos na agenda; a volta antiga passava uma vez por leilão
+    volta = varredura_antiga([e for e in agenda if e[2] == "leilao_iniciado"])
+    print(f"{n} leilões: agenda montada em {montagem * 1000:.0f}ms; "
+          f"loop antigo gastava {volta * 1000:.0f}ms por volta (1 volta/s)")
+
+    atrasos = []
+    inicio = time.perf_counter()
+    rodar_agenda(agenda, lambda instante, rk, leilao: atrasos.append(time.time() - instante), time.sleep)
+    print(f"{len(atrasos)} eventos em {time.perf_counter() - inicio:.0f}s")
+    atrasos.sort()
+    ms = lambda x: x * 1000
+    print(f"atraso p50={ms(atrasos[len(atrasos) // 2]):.2f}ms  "
+          f"p99={ms(atrasos[int(len(atrasos) * 0.99)]):.2f}ms  max={ms(atrasos[-1]):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
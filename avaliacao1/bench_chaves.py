@@ -0,0 +1,55 @@
+import os
+import sys
+import json
+import time
+import tempfile
+from Crypto.PublicKey import RSA
+from Crypto.Signature import pkcs1_15
+from Crypto.Hash import SHA256
+from chaves import CacheChaves, caminho_chave, novo_verificador, TIPO_RSA
+
+# Verificações de lance por segundo no ms_lance: lendo e importando a chave
+# pública do disco a cada lance (como era) e com o CacheChaves.
+# Uso: python bench_chaves.py [clientes] [lances]
+def preparar(pasta, n_clientes, n_lances):
+    chaves = []
+    for i in range(n_clientes):
+        key = RSA.generate(2048)
+        os.makedirs(os.path.join(pasta, f"C{i}"))
+        with open(caminho_chave(f"C{i}", pasta), "wb") as f:
+            f.write(key.publickey().export_key(format="DER"))
+        chaves.append(key)
+    lances = []
+    for v in range(n_lances):
+        lance = {"id": f"C{v % n_clientes}", "valor": str(v), "item": "1"}
+        data = json.dumps(lance, ensure_ascii=False).encode()
+        lances.append((lance, data, pkcs1_15.new(chaves[v % n_clientes]).sign(SHA256.new(data))))
+    return lances
+
+
+def sem_cache(pasta, lance):
+    with open(caminho_chave(lance["id"], pasta), "rb") as f:
+        return novo_verificador(TIPO_RSA, RSA.import_key(f.read()))
+
+
+def medir(nome, lances, obter_verificador):
+    inicio = time.perf_counter()
+    for lance, data, assinatura in lances:
+        obter_verificador(lance)(data, assinatura)
+    total = time.perf_counter() - inicio
+    print(f"{nome:<10} {len(lances) / total:9.0f} verificações/s  ({total / len(lances) * 1e6:.0f}us por lance)")
+
+
+def main():
+    n_clientes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    n_lances = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    with tempfile.TemporaryDirectory() as pasta:
+        lances = preparar(pasta, n_clientes, n_lances)
+        medir("sem cache", lances, lambda lance: sem_cache(pasta, lance))
+        cache = CacheChaves(pasta=pasta)
+        medir("com cache", lances, lambda lance: cache.verificador(lance["id"]))
+        print(f"cache: {cache.estatisticas()}")
+
+
+if __name__ == "__main__":
+    main()
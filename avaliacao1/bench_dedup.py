@@ -0,0 +1,53 @@
+import sys
+import json
+import time
+import uuid
+import secrets
+from Crypto.PublicKey import RSA
+from chaves import assinar, novo_verificador, TIPO_RSA
+from estado_leiloes import EstadoLeilao
+
+# Tempestade de reentregas: N lances RSA únicos, cada um entregue R vezes (o
+# original e R-1 reentregas/replays). Compara verificar toda entrega, como o
+# ms_lance fazia, com consultar a janela do EstadoLeilao antes de verificar.
+# Uso: python bench_dedup.py [lances] [entregas_por_lance]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    r = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    chave = RSA.generate(2048)
+    verificar = novo_verificador(TIPO_RSA, chave.public_key())
+    unicos = []
+    for v in range(n):
+        lance = {"id": "C1", "valor": str(v), "item": "L1", "id_lance": uuid.uuid4().hex, "nonce": secrets.token_hex(8)}
+        dados = json.dumps(lance).encode("utf-8")
+        unicos.append((lance, dados, assinar(TIPO_RSA, chave, dados)))
+    #reentregas chegam logo depois do original, intercaladas com outros lances
+    entregas = [unicos[i - k] for i in range(n) for k in range(r) if i - k >= 0]
+
+    inicio = time.perf_counter()
+    for lance, dados, assinatura in entregas:
+        verificar(dados, assinatura)
+    sem_janela = time.perf_counter() - inicio
+
+    estado = EstadoLeilao()
+    verificacoes = 0
+    inicio = time.perf_counter()
+    for lance, dados, assinatura in entregas:
+        chave_lance = (lance["id"], lance["id_lance"])
+        if estado.repetido(chave_lance, assinatura):
+            continue
+        estado.registrar(chave_lance, assinatura)
+        verificar(dados, assinatura)
+        verificacoes += 1
+        estado.oferecer(int(lance["valor"]), lance)
+    com_janela = time.perf_counter() - inicio
+
+    print(f"{len(entregas)} entregas de {n} lances")
+    print(f"sem janela  {len(entregas) / sem_janela:7.0f} entregas/s  ({len(entregas)} verificações)")
+    print(f"com janela  {len(entregas) / com_janela:7.0f} entregas/s  ({verificacoes} verificações)")
+
+
+if __name__ == "__main__":
+    main()
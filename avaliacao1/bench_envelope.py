@@ -0,0 +1,48 @@
+import sys
+import json
+import base64
+import timeit
+from envelope import montar_envelope, abrir_envelope
+
+# Custo de montar e abrir a mensagem de lance assinado, sem a criptografia:
+# formato antigo (JSON + "||" + assinatura em base64, e o ms_lance serializa o
+# JSON de novo para verificar) x envelope com os bytes assinados.
+# Uso: python bench_envelope.py [repeticoes]
+LANCE = {"id": "cliente_42", "valor": "1500", "item": "3"}
+ASSINATURA = bytes(range(256))      # RSA-2048: 256 bytes
+
+
+def montar_antigo():
+    return (json.dumps(LANCE, ensure_ascii=False) + "||" + base64.b64encode(ASSINATURA).decode("utf-8")).encode("utf-8")
+
+
+def abrir_antigo(corpo):
+    json_part, assinatura_b64 = corpo.decode("utf-8").split("||")
+    lance = json.loads(json_part)
+    assinatura = base64.b64decode(assinatura_b64)
+    dados = json.dumps(lance, ensure_ascii=False).encode()     # bytes para verificar
+    return lance, dados, assinatura
+
+
+def montar_novo():
+    return montar_envelope(json.dumps(LANCE, ensure_ascii=False).encode("utf-8"), ASSINATURA)
+
+
+def abrir_novo(corpo):
+    dados, assinatura = abrir_envelope(corpo)
+    return json.loads(dados), dados, assinatura
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print(f"{'formato':<10} {'bytes':>6} {'montar':>10} {'abrir':>10}")
+    for nome, montar, abrir in [("antigo", montar_antigo, abrir_antigo), ("envelope", montar_novo, abrir_novo)]:
+        corpo = montar()
+        assert abrir(corpo)[0] == LANCE
+        t_montar = timeit.timeit(montar, number=n) / n
+        t_abrir = timeit.timeit(lambda: abrir(corpo), number=n) / n
+        print(f"{nome:<10} {len(corpo):>6} {t_montar * 1e6:>8.2f}us {t_abrir * 1e6:>8.2f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import sys
+import time
+import threading
+import uuid
+import secrets
+import pika
+import cliente
+from chaves import carregar_ou_gerar
+
+# Latência ponta a ponta das notificações: publica lances assinados como o
+# cliente faz e mede até a notificação de cada um voltar (ms_lance ->
+# ms_notificacao -> fila do cliente). Precisa do RabbitMQ local e de
+# ms_leilao, ms_lance e ms_notificacao rodando, com algum leilão ativo.
+# Cada lance só é enviado depois da notificação do anterior.
+# Uso: python bench_notificacao.py [lances] [rsa|ed25519]
+CLIENTE_ID = "bench_notificacao"
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    tipo, chave = carregar_ou_gerar(CLIENTE_ID, sys.argv[2] if len(sys.argv) > 2 else None)
+
+    params = pika.ConnectionParameters("localhost")
+    consumidor = cliente.ConsumidorCliente(params)
+    threading.Thread(target=consumidor.rodar, daemon=True).start()
+    if not consumidor.pronto.wait(10):
+        print("Não foi possível conectar ao RabbitMQ.")
+        return
+
+    print("Esperando um leilão ativo...")
+    while True:
+        with cliente.data_lock:
+            ativos = list(cliente.leiloes_ativos)
+        if ativos:
+            break
+        time.sleep(0.2)
+    leilao_id = ativos[0]
+
+    conn_pub = pika.BlockingConnection(params)
+    ch_pub = conn_pub.channel()
+    ch_pub.exchange_declare(exchange=cliente.EXCHANGE_NAME, exchange_type="direct")
+    base = int(time.time())     # valores sempre maiores que os de execuções anteriores
+    try:
+        for i in range(n):
+            recebidas = len(cliente.latencias)
+            lance = {"id": CLIENTE_ID, "valor": str(base + i), "item": leilao_id,
+                     "id_lance": uuid.uuid4().hex, "nonce": secrets.token_hex(8)}
+            cliente.enviar_lance(ch_pub, consumidor, lance, tipo, chave)
+            limite = time.monotonic() + 5
+            while len(cliente.latencias) == recebidas and time.monotonic() < limite:
+                time.sleep(0.0005)
+            if len(cliente.latencias) == recebidas:
+                print(f"Lance {i} sem notificação em 5s (leilão {leilao_id} encerrou?)")
+                break
+    finally:
+        conn_pub.close()
+        consumidor.parar()
+
+    print(f"{tipo}, leilão {leilao_id}: {cliente.resumo_latencias()}")
+
+
+if __name__ == "__main__":
+    main()
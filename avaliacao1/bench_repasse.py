@@ -0,0 +1,60 @@
+import sys
+import time
+import pika
+from mensagens import codificar, decodificar
+
+# Gerador de carga para o ms_notificacao: publica N lances válidos em
+# "lance_validado", espalhados por L leilões, e por fim o vencedor de cada
+# leilão em "leilao_vencedor". Uma fila própria escuta os leilao_<id> e o tempo
+# vai da primeira publicação até chegar o último vencedor (vencedores nunca são
+# descartados, então marcam o fim do repasse).
+# Precisa do RabbitMQ local e do ms_notificacao rodando, em um dos modos
+#   python ms_notificacao.py direto   ou   python ms_notificacao.py confirmado
+# O confirmado espera o confirm de cada repasse: mede o custo da garantia de
+# entrega, compensado só em parte pela conflação dos lances obsoletos.
+# Uso: python bench_repasse.py [lances] [leiloes]
+EXCHANGE_NAME = "leilao_control"
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    n_leiloes = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    conn = pika.BlockingConnection(pika.ConnectionParameters("localhost"))
+    ch = conn.channel()
+    ch.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
+    fila = ch.queue_declare(queue="", exclusive=True).method.queue
+    for i in range(n_leiloes):
+        ch.queue_bind(exchange=EXCHANGE_NAME, queue=fila, routing_key=f"leilao_bench{i}")
+
+    def publicar(routing_key, lance):
+        content_type, body = codificar(lance)
+        ch.basic_publish(exchange=EXCHANGE_NAME, routing_key=routing_key, body=body,
+                         properties=pika.BasicProperties(content_type=content_type))
+
+    inicio = time.perf_counter()
+    for v in range(n):
+        publicar("lance_validado", {"id": "C1", "valor": str(v), "item": f"bench{v % n_leiloes}", "venceu": False})
+    for i in range(n_leiloes):
+        publicar("leilao_vencedor", {"id": "C1", "valor": str(n + i), "item": f"bench{i}", "venceu": True})
+    publicacao = time.perf_counter() - inicio
+
+    recebidas = 0
+    vencedores = 0
+    for method, properties, body in ch.consume(fila, auto_ack=True, inactivity_timeout=30):
+        if method is None:
+            print("Sem mensagens há 30s: o ms_notificacao está rodando?")
+            break
+        recebidas += 1
+        if decodificar(body, properties.content_type)["venceu"]:
+            vencedores += 1
+            if vencedores == n_leiloes:
+                break
+    total = time.perf_counter() - inicio
+    conn.close()
+    print(f"{n} lances em {n_leiloes} leilões: publicados em {publicacao:.2f}s, repassados em {total:.2f}s "
+          f"({n / total:.0f} lances/s); {recebidas} notificações entregues")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import sys
+import time
+import json
+from chaves import gerar_chave, assinar, novo_verificador, TIPOS_CHAVE
+
+# Custo de cada tipo de chave no caminho de um lance: gerar o par (início do
+# cliente), assinar (cliente) e verificar (ms_lance), além do tamanho da
+# assinatura que vai no envelope.
+# Uso: python bench_tipos_chave.py [lances]
+
+
+def medir(tipo, n):
+    inicio = time.perf_counter()
+    chave = gerar_chave(tipo)
+    t_gerar = time.perf_counter() - inicio
+    verificar = novo_verificador(tipo, chave.public_key())
+    dados = [json.dumps({"id": "C1", "item": "L1", "valor": str(v)}).encode("utf-8") for v in range(n)]
+
+    inicio = time.perf_counter()
+    assinaturas = [assinar(tipo, chave, d) for d in dados]
+    t_assinar = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for d, a in zip(dados, assinaturas):
+        verificar(d, a)
+    t_verificar = time.perf_counter() - inicio
+
+    print(f"{tipo:<8} gerar {t_gerar * 1000:7.1f}ms  assinar {n / t_assinar:7.0f}/s  "
+          f"verificar {n / t_verificar:7.0f}/s  assinatura {len(assinaturas[0])} bytes")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for tipo in TIPOS_CHAVE:
+        medir(tipo, n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import time
+import tempfile
+from bench_chaves import preparar
+from chaves import PASTA_CLIENTES
+from verificacao import VerificadorParalelo
+
+# Lances verificados por segundo com o VerificadorParalelo, variando o número
+# de processos do pool (0 = na própria thread, como era). Os resultados são
+# consumidos em ordem de chegada, como no ms_lance.
+# Uso: python bench_verificacao.py [clientes] [lances] [processos...]
+def medir(processos, lances):
+    verificador = VerificadorParalelo(processos)
+    # aquece o pool (sobe os workers e carrega as chaves) fora da medição
+    for lance, dados, assinatura in lances[:100]:
+        verificador.enviar(lance["id"], dados, assinatura, lance)
+    list(verificador.drenar())
+
+    inicio = time.perf_counter()
+    validos = 0
+    for lance, dados, assinatura in lances:
+        verificador.enviar(lance["id"], dados, assinatura, lance)
+        validos += sum(ok for ok, _ in verificador.prontos())
+    validos += sum(ok for ok, _ in verificador.drenar())
+    total = time.perf_counter() - inicio
+    verificador.fechar()
+    print(f"processos={processos:<3} {len(lances) / total:9.0f} lances/s  ({validos} válidos)")
+
+
+def main():
+    n_clientes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    n_lances = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    nucleos = os.cpu_count() or 1
+    configuracoes = [int(p) for p in sys.argv[3:]] or sorted({0, 1, 2, 4, nucleos})
+    with tempfile.TemporaryDirectory() as pasta:
+        # os workers procuram as chaves em ./Clientes
+        lances = preparar(os.path.join(pasta, PASTA_CLIENTES), n_clientes, n_lances)
+        os.chdir(pasta)
+        for processos in configuracoes:
+            medir(processos, lances)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import os
+import collections
+from Crypto.PublicKey import RSA, ECC
+from Crypto.Signature import pkcs1_15, eddsa
+from Crypto.Hash import SHA256
+
+PASTA_CLIENTES = "Clientes"
+MAX_CHAVES = 1024       # verificadores mantidos em memória
+TIPO_RSA = "rsa"
+TIPO_ED25519 = "ed25519"
+TIPOS_CHAVE = (TIPO_RSA, TIPO_ED25519)
+
+
+def caminho_chave(cliente_id, pasta=PASTA_CLIENTES):
+    return os.path.join(pasta, cliente_id, "public_key.der")
+
+
+def caminho_chave_privada(cliente_id, pasta=PASTA_CLIENTES):
+    return os.path.join(pasta, cliente_id, "private_key.der")
+
+
+def caminho_tipo(cliente_id, pasta=PASTA_CLIENTES):
+    return os.path.join(pasta, cliente_id, "tipo_chave")
+
+
+# ----- Tipos de Chave -----
+#O tipo da chave de cada cliente fica em Clientes/<id>/tipo_chave, ao lado do
+#public_key.der; clientes antigos, sem esse arquivo, usam RSA.
+def ler_tipo(cliente_id, pasta=PASTA_CLIENTES):
+    try:
+        with open(caminho_tipo(cliente_id, pasta)) as f:
+            tipo = f.read().strip()
+    except FileNotFoundError:
+        return TIPO_RSA
+    if tipo not in TIPOS_CHAVE:
+        raise ValueError(f"tipo de chave desconhecido: {tipo}")
+    return tipo
+
+
+def gerar_chave(tipo):
+    if tipo == TIPO_ED25519:
+        return ECC.generate(curve="Ed25519")
+    return RSA.generate(2048)
+
+
+def importar_chave(tipo, der):
+    if tipo == TIPO_ED25519:
+        return ECC.import_key(der)
+    return RSA.import_key(der)
+
+
+def assinar(tipo, chave_privada, dados):
+    if tipo == TIPO_ED25519:
+        return eddsa.new(chave_privada, "rfc8032").sign(dados)
+    return pkcs1_15.new(chave_privada).sign(SHA256.new(dados))
+
+
+def novo_verificador(tipo, chave_publica):
+    #função verificar(dados, assinatura), que levanta ValueError se não confere
+    if tipo == TIPO_ED25519:
+        esquema = eddsa.new(chave_publica, "rfc8032")
+        return esquema.verify
+    esquema = pkcs1_15.new(chave_publica)
+    return lambda dados, assinatura: esquema.verify(SHA256.new(dados), assinatura)
+
+
+#Reaproveita o par de chaves salvo do cliente, se houver (e for do tipo pedido);
+#senão gera um novo e grava chave privada, tipo e, por último, a chave pública,
+#que é o arquivo que o ms_lance observa. tipo=None aceita o tipo já salvo.
+def carregar_ou_gerar(cliente_id, tipo=None, pasta=PASTA_CLIENTES):
+    privada = caminho_chave_privada(cliente_id, pasta)
+    if os.path.exists(privada) and os.path.exists(caminho_chave(cliente_id, pasta)):
+        tipo_salvo = ler_tipo(cliente_id, pasta)
+        if tipo in (None, tipo_salvo):
+            with open(privada, "rb") as f:
+                return tipo_salvo, importar_chave(tipo_salvo, f.read())
+
+    tipo = tipo or TIPO_RSA
+    chave = gerar_chave(tipo)
+    os.makedirs(os.path.join(pasta, cliente_id), exist_ok=True)
+    with open(privada, "wb") as f:
+        f.write(chave.export_key(format="DER"))
+    with open(caminho_tipo(cliente_id, pasta), "w") as f:
+        f.write(tipo)
+    with open(caminho_chave(cliente_id, pasta), "wb") as f:
+        f.write(chave.public_key().export_key(format="DER"))
+    return tipo, chave
+
+
+# ----- Cache de Chaves Públicas -----
+#Guarda o verificador já montado (chave DER lida e importada) de cada cliente,
+#em ordem LRU e com no máximo max_chaves entradas. A cada uso o arquivo passa
+#por um os.stat: se mtime, inode ou tamanho mudaram (cliente gerou chave nova),
+#a entrada é descartada e a chave é lida de novo, junto com o seu tipo.
+class CacheChaves:
+    def __init__(self, max_chaves=MAX_CHAVES, pasta=PASTA_CLIENTES):
+        self.max_chaves = max_chaves
+        self.pasta = pasta
+        self._entradas = collections.OrderedDict()     # cliente_id -> (assinatura do arquivo, verificador)
+        self.hits = 0
+        self.misses = 0
+
+    def verificador(self, cliente_id):
+        #FileNotFoundError se o cliente não tem chave pública
+        caminho = caminho_chave(cliente_id, self.pasta)
+        try:
+            st = os.stat(caminho)
+        except FileNotFoundError:
+            self._entradas.pop(cliente_id, None)
+            raise
+        versao = (st.st_mtime_ns, st.st_ino, st.st_size)
+
+        entrada = self._entradas.get(cliente_id)
+        if entrada is not None and entrada[0] == versao:
+            self._entradas.move_to_end(cliente_id)
+            self.hits += 1
+            return entrada[1]
+
+        self.misses += 1
+        tipo = ler_tipo(cliente_id, self.pasta)
+        with open(caminho, "rb") as f:
+            verificador = novo_verificador(tipo, importar_chave(tipo, f.read()))
+        self._entradas[cliente_id] = (versao, verificador)
+        self._entradas.move_to_end(cliente_id)
+        while len(self._entradas) > self.max_chaves:
+            self._entradas.popitem(last=False)
+        return verificador
+
+    def estatisticas(self):
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "entradas": len(self._entradas),
+                "taxa_hit": self.hits / total if total else 0.0}
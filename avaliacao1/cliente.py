@@ -1,129 +1,139 @@
+import sys
 import json
-import os
 import threading
-import base64
-import queue
+import uuid
+import secrets
 import time
 import pika
-from Crypto.PublicKey import RSA
-from Crypto.Signature import pkcs1_15
-from Crypto.Hash import SHA256
+from consumidor import Consumidor
+from mensagens import decodificar
+from envelope import montar_envelope, CONTENT_TYPE_ENVELOPE
+from chaves import carregar_ou_gerar, assinar, TIPOS_CHAVE
 from rich.console import Console
 from rich.table import Table
 
 EXCHANGE_NAME = "leilao_control"
 leiloes_ativos = {}                 # dict {id_leilao: leilao com o campo "lances" adicionado}
-data_lock = threading.Lock()        # mutex para acessar o dict acima, pois é compartilhado entre as 3 threads
-registration_queue = queue.Queue()  # fila para registrar pedidos de escuta em leilões específicos
+data_lock = threading.Lock()        # mutex para os dicts acima, compartilhados entre a interface e o consumidor
+lances_enviados = {}                # dict {(leilao, cliente, valor): instante do envio}, para medir a latência
+MAX_LANCES_ENVIADOS = 1000          # lances recusados nunca são notificados: a espera por eles é limitada
+EXPIRA_LANCE = 60                   # segundos esperando a notificação de um lance
+latencias = []                      # segundos entre enviar um lance e receber a sua notificação
 stop_event = threading.Event()      # evento para sinalizar fim de execução para threads em paralelo
 console = Console()                 # para prints da interface
 
 
 # ----- Assinaturas -----
-def gerar_chaves(cliente_id):
-    key = RSA.generate(2048)
-    private_key = key
+#Reaproveita o par de chaves salvo em Clientes/<id> (gerar RSA-2048 a cada
+#início é lento); tipo: "rsa", "ed25519" ou None para o que já existir
+def gerar_chaves(cliente_id, tipo=None):
+    tipo, private_key = carregar_ou_gerar(cliente_id, tipo)
+    print(f"Chave {tipo} do cliente {cliente_id} pronta.")
+    return tipo, private_key
 
-    pasta_cliente = os.path.join("Clientes", cliente_id)
-    os.makedirs(pasta_cliente, exist_ok=True)
-    pub_path = os.path.join(pasta_cliente, "public_key.der")
 
-    public_key = key.publickey()
-    with open(pub_path, "wb") as f:
-        f.write(public_key.export_key(format="DER"))
-
-    return private_key
-
-
-def assinar_lance(lance, private_key):
+#O envelope leva os bytes assinados como estão (ver envelope.py)
+def assinar_lance(lance, tipo, private_key):
+    lance_bytes = json.dumps(lance, ensure_ascii=False).encode("utf-8")
     try:
-        lance_bytes = json.dumps(lance, ensure_ascii=False).encode("utf-8")
-        h = SHA256.new(lance_bytes)
-        assinatura = pkcs1_15.new(private_key).sign(h)
-        assinatura_b64 = base64.b64encode(assinatura).decode("utf-8")
-        return json.dumps(lance, ensure_ascii=False) + "||" + assinatura_b64
+        assinatura = assinar(tipo, private_key, lance_bytes)
     except Exception as e:
         print(f"\n [!] Erro ao assinar -> {e}")
-        return json.dumps(lance, ensure_ascii=False) + "|| "
+        assinatura = b""
+    return montar_envelope(lance_bytes, assinatura)
 
 
 # ----- Controle dos Leiloes Iniciados -----
 def callback_leiloes(ch, method, properties, body):
-    leilao = json.loads(body.decode("utf-8"))
+    leilao = decodificar(body, properties.content_type)
     leilao['melhor lance'] = None
 
     with data_lock:
         leiloes_ativos[leilao["id_leilao"]] = leilao
-    ch.basic_ack(delivery_tag=method.delivery_tag)
 
 
 # ----- Controle das Notificações -----
 def callback_notificacoes(ch, method, properties, body):
-    lance = json.loads(body.decode("utf-8"))
+    lance = decodificar(body, properties.content_type)
 
     if lance.get("venceu"):
         with data_lock:
             leiloes_ativos.pop(lance['item'])
+            #leilão encerrado: nenhum lance pendente dele vai ser notificado
+            for chave in [c for c in lances_enviados if c[0] == lance['item']]:
+                del lances_enviados[chave]
         print(f"\nCliente {lance['id']} venceu o leilão {lance['item']} com lance R$ {lance['valor']}")
     else:
         with data_lock:
             leiloes_ativos[lance['item']]['melhor lance'] = lance
-        print(f"\nNovo lance: Cliente {lance['id']} deu um lance de R$ {lance['valor']} no leilão {lance['item']}")
-    ch.basic_ack(delivery_tag=method.delivery_tag)
-
+            enviado = lances_enviados.pop((lance['item'], lance['id'], lance['valor']), None)
+            if enviado is not None:
+                latencias.append(time.monotonic() - enviado)
+        extra = f" ({latencias[-1] * 1000:.1f} ms)" if enviado is not None else ""
+        print(f"\nNovo lance: Cliente {lance['id']} deu um lance de R$ {lance['valor']} no leilão {lance['item']}{extra}")
+
+
+# ----- Thread do Consumidor -----
+#Uma só conexão consome as duas filas do cliente (leilao_iniciado e a fila dos
+#leilões de interesse) e despacha cada mensagem assim que chega, sem dormir
+#entre rodadas. A conexão pika só pode ser usada pela thread do consumidor: os
+#binds pedidos pela interface e o pedido de parada entram por
+#add_callback_threadsafe, que também acorda o process_data_events na hora.
+class ConsumidorCliente:
+    def __init__(self, connection_params):
+        self.connection_params = connection_params
+        self.pronto = threading.Event()     # conexão aberta e filas consumidas
+        self._conn = None
+        self._ch = None
+        self._fila = None
+        self._vinculados = set()            # leilões com bind; só alterado na thread do consumidor
+
+    def rodar(self):
+        conn = pika.BlockingConnection(self.connection_params)
+        ch = conn.channel()
+        ch.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
+
+        fila_leiloes = ch.queue_declare(queue="", exclusive=True).method.queue
+        ch.queue_bind(exchange=EXCHANGE_NAME, queue=fila_leiloes, routing_key="leilao_iniciado")
+        self._fila = ch.queue_declare(queue="", exclusive=True).method.queue
+
+        consumidor = Consumidor(conn, ch)
+        consumidor.consumir(fila_leiloes, callback_leiloes)
+        consumidor.consumir(self._fila, callback_notificacoes)
+        self._conn, self._ch = conn, ch
+        self.pronto.set()
 
-# ----- Thread para escutar Leiloes Iniciados -----
-def leilao_worker(connection_params):
-    conn = pika.BlockingConnection(connection_params)
-    ch = conn.channel()
-    ch.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
-
-    result = ch.queue_declare(queue="", exclusive=True)
-    queue_name = result.method.queue
-    ch.queue_bind(exchange=EXCHANGE_NAME, queue=queue_name, routing_key="leilao_iniciado")
-    ch.basic_consume(queue=queue_name, on_message_callback=callback_leiloes)
-
-    try:
-        while not stop_event.is_set():
-            conn.process_data_events(time_limit=1)
-            time.sleep(0.1)
-    finally:
         try:
-            conn.close()
-        except Exception:
-            pass
-
-
-# ----- Thread para escutar Leiloes de Interesse -----
-def notification_worker(connection_params):
-    conn = pika.BlockingConnection(connection_params)
-    ch = conn.channel()
-    ch.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
-
-    result = ch.queue_declare(queue="", exclusive=True)
-    queue_name = result.method.queue
-    ch.basic_consume(queue=queue_name, on_message_callback=callback_notificacoes)
-
-    try:
-        # Enquanto não receber sinal para finalizar execução...
-        while not stop_event.is_set():
-            # Faz um bind para todos os pedidos na fila registration_queue
-            while True:
-                try:
-                    leilao_id = registration_queue.get_nowait()
-                except queue.Empty:
-                    break
-                ch.queue_bind(exchange=EXCHANGE_NAME, queue=queue_name, routing_key=f"leilao_{leilao_id}")
-                registration_queue.task_done()
-
-            # Processa os lances enviados nos leilões de interesse por 1s
-            conn.process_data_events(time_limit=1)
-            time.sleep(0.1)
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
+            consumidor.rodar(parar=stop_event.is_set)
+        finally:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    def vincular(self, leilao_id, timeout=5.0):
+        #Qualquer thread. Só volta depois do bind (True) ou do timeout (False),
+        #para que a notificação do lance publicado em seguida não se perca
+        if leilao_id in self._vinculados:
+            return True
+        feito = threading.Event()
+
+        def aplicar():
+            if leilao_id not in self._vinculados:
+                self._ch.queue_bind(exchange=EXCHANGE_NAME, queue=self._fila, routing_key=f"leilao_{leilao_id}")
+                self._vinculados.add(leilao_id)
+            feito.set()
+
+        self._conn.add_callback_threadsafe(aplicar)
+        return feito.wait(timeout)
+
+    def parar(self):
+        stop_event.set()
+        if self._conn is not None:
+            try:
+                self._conn.add_callback_threadsafe(lambda: None)    # só acorda a thread
+            except Exception:
+                pass
 
 
 # ----- Interface -----
@@ -148,7 +158,40 @@ def mostrar_leiloes():
     console.print(table)
 
 
-def interface_usuario(cliente_id, private_key, connection_params):
+#Latência ponta a ponta: do envio do lance até a notificação dele voltar pelo
+#ms_lance e ms_notificacao (só lances válidos geram notificação)
+def resumo_latencias():
+    with data_lock:
+        amostras = sorted(latencias)
+    if not amostras:
+        return None
+    def p(q):
+        return amostras[min(len(amostras) - 1, int(q * len(amostras)))] * 1000
+    return f"{len(amostras)} lances, p50 {p(0.5):.1f} ms, p99 {p(0.99):.1f} ms, máx {amostras[-1] * 1000:.1f} ms"
+
+
+def enviar_lance(ch_pub, consumidor, lance, tipo, private_key):
+    if not consumidor.vincular(lance['item']):
+        print(f"[!] Sem bind para o leilão {lance['item']}: a notificação deste lance pode não chegar")
+    mensagem = assinar_lance(lance, tipo, private_key)
+    agora = time.monotonic()
+    chave = (lance['item'], lance['id'], lance['valor'])
+    with data_lock:
+        #o dict fica em ordem de envio; os mais antigos saem por idade ou pelo limite
+        lances_enviados.pop(chave, None)
+        lances_enviados[chave] = agora
+        while lances_enviados:
+            antigo, enviado = next(iter(lances_enviados.items()))
+            if agora - enviado <= EXPIRA_LANCE and len(lances_enviados) <= MAX_LANCES_ENVIADOS:
+                break
+            del lances_enviados[antigo]
+    ch_pub.basic_publish(exchange=EXCHANGE_NAME,
+                         routing_key="lance_realizado",
+                         body=mensagem,
+                         properties=pika.BasicProperties(content_type=CONTENT_TYPE_ENVELOPE))
+
+
+def interface_usuario(cliente_id, tipo, private_key, connection_params, consumidor):
     conn_pub = pika.BlockingConnection(connection_params)
     ch_pub = conn_pub.channel()
     ch_pub.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
@@ -179,19 +222,20 @@ def interface_usuario(cliente_id, private_key, connection_params):
                 lance = {
                     "id": cliente_id,
                     "valor": valor,
-                    "item": leilao_id
+                    "item": leilao_id,
+                    "id_lance": uuid.uuid4().hex,       # o ms_lance descarta reentregas/replays pelo id
+                    "nonce": secrets.token_hex(8)
                 }
 
-                registration_queue.put(leilao_id)
-                mensagem = assinar_lance(lance, private_key)
-                ch_pub.basic_publish(exchange=EXCHANGE_NAME,
-                                         routing_key="lance_realizado",
-                                         body=mensagem.encode("utf-8"))
+                enviar_lance(ch_pub, consumidor, lance, tipo, private_key)
                 print(f"[UI] Lance enviado: R$ {valor} no leilão {leilao_id}")
 
             elif escolha == "3":
+                resumo = resumo_latencias()
+                if resumo:
+                    print(f"Latência das notificações: {resumo}")
                 print("Saindo...")
-                stop_event.set()
+                consumidor.parar()
                 break
             else:
                 print("Opção inválida!")
@@ -204,22 +248,28 @@ def interface_usuario(cliente_id, private_key, connection_params):
 
 # ----- Main -----
 def main():
+    #python cliente.py [rsa|ed25519]: Ed25519 gera a chave e assina bem mais rápido
+    #(a verificação no ms_lance, com pycryptodome, é mais lenta que a do RSA)
+    tipo = sys.argv[1] if len(sys.argv) > 1 else None
+    if tipo not in (None,) + TIPOS_CHAVE:
+        print(f"Tipo de chave inválido: {tipo} (use {' ou '.join(TIPOS_CHAVE)})")
+        return
     cliente_id = input("Digite seu ID: ")
-    private_key = gerar_chaves(cliente_id)
+    tipo, private_key = gerar_chaves(cliente_id, tipo)
 
     connection_params = pika.ConnectionParameters("localhost")
 
-    #Thread para escutar a fila "leilao_iniciado" paralelamente
-    t1 = threading.Thread(target=leilao_worker, args=(connection_params,), daemon=True)
-    t1.start()
-
-    #Thread para escutar dinâmicamente as filas dos leiloes de interesse
-    #do cliente
-    t2 = threading.Thread(target=notification_worker, args=(connection_params,), daemon=True)
-    t2.start()
+    #Thread que escuta "leilao_iniciado" e os leilões de interesse do cliente
+    consumidor = ConsumidorCliente(connection_params)
+    t = threading.Thread(target=consumidor.rodar, daemon=True)
+    t.start()
+    if not consumidor.pronto.wait(10):
+        print("Não foi possível conectar ao RabbitMQ.")
+        stop_event.set()
+        return
 
     #Interface para exibição dos leilões e realização dos lances
-    interface_usuario(cliente_id, private_key, connection_params)
+    interface_usuario(cliente_id, tipo, private_key, connection_params, consumidor)
 
 
 if __name__ == "__main__":
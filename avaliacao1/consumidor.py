@@ -0,0 +1,68 @@
+
+PREFETCH = 256          # mensagens entregues e ainda sem ack, por canal
+LOTE_ACK = 64           # mensagens processadas por ack (multiple=True)
+INTERVALO = 1.0         # espera máxima de cada rodada de process_data_events
+
+
+class Consumidor:
+    # Consumo com janela de prefetch (basic_qos) e acks em lote, usado por
+    # todos os consumidores pika dos serviços. Os callbacks não fazem ack:
+    # depois de cada mensagem processada o Consumidor guarda o delivery_tag e
+    # confirma tudo de uma vez com basic_ack(multiple=True) a cada lote_ack
+    # mensagens ou ao fim de cada rajada entregue pelo broker. Como os callbacks
+    # de um canal rodam em ordem, o ack múltiplo só cobre mensagens já processadas.
+    # antes_do_ack, se informado, é chamado antes de cada ack; se devolver False
+    # o lote não é confirmado e o Consumidor para (rodar() retorna): as
+    # mensagens sem ack voltam para a fila quando a conexão é fechada.
+    def __init__(self, conn, ch, prefetch=PREFETCH, lote_ack=LOTE_ACK, antes_do_ack=None):
+        self.conn = conn
+        self.ch = ch
+        self.lote_ack = lote_ack
+        self.antes_do_ack = antes_do_ack
+        self._ultimo_tag = None     # maior delivery_tag processado e ainda sem ack
+        self._sem_ack = 0
+        self.mensagens = 0
+        self.acks = 0
+        self.parado = False
+        ch.basic_qos(prefetch_count=prefetch)
+
+    def consumir(self, fila, callback):
+        def entregar(ch, method, properties, body):
+            if self.parado:
+                return      # sem processar nem ack: volta para a fila
+            try:
+                callback(ch, method, properties, body)
+            except Exception as e:
+                # mesma política de antes: mensagem com erro é descartada (ack)
+                print(f" [!] Erro processando mensagem de {fila}: {e}")
+            finally:
+                self._processada(method.delivery_tag)
+        self.ch.basic_consume(queue=fila, on_message_callback=entregar)
+
+    def _processada(self, delivery_tag):
+        self._ultimo_tag = delivery_tag
+        self._sem_ack += 1
+        self.mensagens += 1
+        if self._sem_ack >= self.lote_ack:
+            self.confirmar()
+
+    def confirmar(self):
+        if self._ultimo_tag is None or self.parado:
+            return
+        if self.antes_do_ack and self.antes_do_ack() is False:
+            self.parado = True
+            return
+        self.ch.basic_ack(delivery_tag=self._ultimo_tag, multiple=True)
+        self._ultimo_tag = None
+        self._sem_ack = 0
+        self.acks += 1
+
+    def processar(self, time_limit=INTERVALO):
+        # uma rodada: despacha a rajada que chegou e confirma o que foi processado
+        self.conn.process_data_events(time_limit=time_limit)
+        self.confirmar()
+
+    def rodar(self, parar=None):
+        # substitui ch.start_consuming()
+        while not self.parado and (parar is None or not parar()):
+            self.processar()
@@ -0,0 +1,29 @@
+import struct
+
+# ----- Envelope do Lance Assinado -----
+#O lance vai com os bytes exatos que foram assinados, então o ms_lance
+#verifica a assinatura sobre eles sem serializar o JSON de novo (a ordem das
+#chaves ou a formatação deixam de importar) e não depende de separadores no
+#corpo. Formato (inteiros big-endian):
+#   [versão: 1 byte][tamanho do lance: 4 bytes][tamanho da assinatura: 2 bytes]
+#   [lance: JSON UTF-8][assinatura]
+CONTENT_TYPE_ENVELOPE = "application/x-lance-assinado"
+VERSAO_ENVELOPE = 1
+_CABECALHO = struct.Struct("!BIH")
+
+
+def montar_envelope(dados, assinatura):
+    return _CABECALHO.pack(VERSAO_ENVELOPE, len(dados), len(assinatura)) + dados + assinatura
+
+
+def abrir_envelope(corpo):
+    #(dados assinados, assinatura); ValueError se o envelope estiver malformado
+    if len(corpo) < _CABECALHO.size:
+        raise ValueError("envelope de lance truncado")
+    versao, n_dados, n_assinatura = _CABECALHO.unpack_from(corpo)
+    if versao != VERSAO_ENVELOPE:
+        raise ValueError(f"versão de envelope não suportada: {versao}")
+    inicio = _CABECALHO.size
+    if len(corpo) != inicio + n_dados + n_assinatura:
+        raise ValueError("envelope de lance com tamanho inválido")
+    return corpo[inicio:inicio + n_dados], corpo[inicio + n_dados:]
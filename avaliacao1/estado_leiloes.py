@@ -0,0 +1,44 @@
+import collections
+
+JANELA_DEDUP = 1024     # ids de lance lembrados por leilão
+
+
+# ----- Estado de um Leilão -----
+#Melhor lance (com o valor já convertido para int) e uma janela limitada dos
+#ids de lance recentes, que deixa descartar reentregas e replays antes da
+#verificação da assinatura. A janela guarda o id junto com a assinatura: só
+#é repetido o lance com o mesmo id e a mesma assinatura (mesmos bytes, já que
+#RSA PKCS#1 v1.5 e Ed25519 são determinísticos), então um lance forjado com o
+#id de outro não bloqueia o verdadeiro, só é verificado e recusado.
+class EstadoLeilao:
+    __slots__ = ("melhor_valor", "melhor_lance", "_janela", "_max_janela")
+
+    def __init__(self, max_janela=JANELA_DEDUP):
+        self.melhor_valor = None
+        self.melhor_lance = None
+        self._janela = collections.OrderedDict()    # (cliente, id_lance) -> assinatura
+        self._max_janela = max_janela
+
+    def repetido(self, chave, assinatura):
+        return self._janela.get(chave) == assinatura
+
+    def registrar(self, chave, assinatura):
+        #na chegada, antes de verificar: reentregas que chegam enquanto o
+        #original ainda está no pool também são descartadas
+        self._janela[chave] = assinatura
+        self._janela.move_to_end(chave)
+        if len(self._janela) > self._max_janela:
+            self._janela.popitem(last=False)
+
+    def esquecer(self, chave, assinatura):
+        #assinatura inválida: não ocupa a janela
+        if self._janela.get(chave) == assinatura:
+            del self._janela[chave]
+
+    def oferecer(self, valor, lance):
+        #True se o lance passa a ser o melhor
+        if self.melhor_valor is not None and valor <= self.melhor_valor:
+            return False
+        self.melhor_valor = valor
+        self.melhor_lance = lance
+        return True
@@ -1,95 +1,132 @@
+import sys
 import pika
 import json
 import base64
-from Crypto.PublicKey import RSA
-from Crypto.Signature import pkcs1_15
-from Crypto.Hash import SHA256
-import os
+from consumidor import Consumidor
+from mensagens import codificar, decodificar
+from verificacao import VerificadorParalelo
+from envelope import abrir_envelope, CONTENT_TYPE_ENVELOPE
+from estado_leiloes import EstadoLeilao
 
 EXCHANGE_NAME = "leilao_control"
-leiloes_ativos = {}     # dict {id_leilao: melhor lance}
+leiloes_ativos = {}     # dict {id_leilao: EstadoLeilao}
+verificador = None      # VerificadorParalelo, criado no main
+descartados = 0         # lances recusados antes da verificação (repetidos, leilão inativo, valor inválido)
 
 
-# ----- Verificação das Assinaturas -----
-def verifica_assinatura(lance, assinatura):
-    try:
-        data = json.dumps(lance, ensure_ascii=False).encode()
-        pasta_cliente = os.path.join("Clientes", lance['id'])
-        pub_path = os.path.join(pasta_cliente, "public_key.der")
-
-        client_public_key = RSA.import_key(open(pub_path, "rb").read())
-        h = SHA256.new(data)
-        pkcs1_15.new(client_public_key).verify(h, assinatura)
-        return True
-    except (ValueError, TypeError) as e:
-        print(f"\n [!] Erro ao verificar assinatura de lance (Cliente:{lance['id']}, Leilao:{lance['item']}): {e}")
-        return False
-    except FileNotFoundError:
-        print(f"\n [!] Chave pública do cliente {lance['id']} não encontrada.")
-        return False
+def publicar(ch, routing_key, payload):
+    content_type, body = codificar(payload)
+    ch.basic_publish(exchange=EXCHANGE_NAME, routing_key=routing_key, body=body,
+                     properties=pika.BasicProperties(content_type=content_type))
 
 
 # ----- Controle dos Leiloes -----
 def callback_leiloes(ch, method, properties, body):
-    leilao = json.loads(body.decode("utf-8"))
+    #Lances que chegaram antes deste evento são decididos antes dele
+    aplicar_lances(ch, verificador.drenar())
+    leilao = decodificar(body, properties.content_type)
     leilao_id = leilao['id_leilao']
 
     if leilao['status'] == "ativo":
-        #Lances são atualizados na callback_lances
-        leiloes_ativos[leilao_id] = None
+        #Lances são atualizados em aplicar_lances
+        leiloes_ativos[leilao_id] = EstadoLeilao()
         print(f" [v] Novo leilão ativo: {leilao_id}")
 
     elif leilao['status'] == "encerrado":
-        vencedor = leiloes_ativos[leilao_id]
+        vencedor = leiloes_ativos[leilao_id].melhor_lance
         if vencedor is not None:
             vencedor['venceu'] = True
-            message = json.dumps(vencedor, ensure_ascii=False)
-            ch.basic_publish(exchange=EXCHANGE_NAME, routing_key='leilao_vencedor', body=message.encode("utf-8"))
+            publicar(ch, 'leilao_vencedor', vencedor)
         del leiloes_ativos[leilao_id]
         print(f" [x] Leilão encerrado: {leilao_id}")
-    ch.basic_ack(delivery_tag=method.delivery_tag)
 
 
 # ----- Controle dos Lances -----
+#Lance {"id", "valor", "item"} e, nos clientes novos, "id_lance" e "nonce"
+#(gerados pelo cliente e cobertos pela assinatura). O que dá para decidir sem
+#a assinatura é decidido na chegada: leilão inativo, valor que não é inteiro
+#e lance repetido (mesmo id_lance e assinatura) nem chegam ao pool. Como os
+#eventos de leilão drenam o pool antes de mudar o estado, um leilão ativo na
+#chegada do lance continua ativo quando ele é aplicado.
 def callback_lances(ch, method, properties, body):
-    body_str = body.decode('utf-8')
-    #Lances são recebidos no formato: Lance(json string) + "||" + Assinatura
-    json_part, assinatura_b64 = body_str.split("||")
-    lance = json.loads(json_part)
-    assinatura = base64.b64decode(assinatura_b64)
-    ch.basic_ack(delivery_tag=method.delivery_tag)
-
-    #Se a assinatura confere, foi um lance em um evento ativo no momento e
-    #não existem lances ou esse lance supera o valor anterior:
-    if (verifica_assinatura(lance, assinatura) and
-         lance['item'] in leiloes_ativos and
-         (leiloes_ativos[lance['item']] is None or
-          int(lance['valor']) > int(leiloes_ativos[lance['item']]['valor']))):
-
-        #Cria o campo 'venceu', inicialmente com False
-        lance['venceu'] = False
-        leiloes_ativos[lance['item']] = lance
-        print(f" [>] Lance válido recebido: Cliente {lance['id']} -> R$ {lance['valor']} no leilão {lance['item']}")
-        message = json.dumps(lance, ensure_ascii=False)
-        ch.basic_publish(exchange=EXCHANGE_NAME, routing_key='lance_validado', body=message.encode("utf-8"))
+    global descartados
+    if properties.content_type == CONTENT_TYPE_ENVELOPE:
+        dados, assinatura = abrir_envelope(body)
+    else:
+        #Formato antigo: Lance(json string) + "||" + Assinatura(base64)
+        dados, assinatura_b64 = body.split(b"||")
+        assinatura = base64.b64decode(assinatura_b64)
+    #Nos dois formatos a assinatura é verificada sobre os bytes recebidos
+    lance = json.loads(dados)
+
+    estado = leiloes_ativos.get(lance['item'])
+    try:
+        valor = int(lance['valor'])
+    except (ValueError, TypeError):
+        valor = None
+    chave = (lance['id'], lance['id_lance']) if 'id_lance' in lance else None
+    if estado is None or valor is None or (chave is not None and estado.repetido(chave, assinatura)):
+        descartados += 1
+        if descartados % 1000 == 1:
+            print(f" [i] {descartados} lances descartados antes da verificação")
+        return
+    if chave is not None:
+        estado.registrar(chave, assinatura)
+
+    #A assinatura é verificada no pool; a decisão sai na ordem de chegada
+    verificador.enviar(lance['id'], dados, assinatura, (lance, valor, chave, assinatura))
+    aplicar_lances(ch, verificador.prontos())
+
+
+def aplicar_lances(ch, verificados):
+    for assinatura_ok, (lance, valor, chave, assinatura) in verificados:
+        estado = leiloes_ativos[lance['item']]
+        if not assinatura_ok:
+            if chave is not None:
+                estado.esquecer(chave, assinatura)
+            continue
+        #Só os campos do lance seguem adiante (id_lance e nonce ficam aqui),
+        #com o campo 'venceu', inicialmente False
+        lance = {"id": lance['id'], "valor": lance['valor'], "item": lance['item'], "venceu": False}
+        #Assinatura confere e o lance supera o valor anterior (ou é o primeiro)
+        if estado.oferecer(valor, lance):
+            print(f" [>] Lance válido recebido: Cliente {lance['id']} -> R$ {lance['valor']} no leilão {lance['item']}")
+            publicar(ch, 'lance_validado', lance)
 
 
 # ----------
 
-connection = pika.BlockingConnection(pika.ConnectionParameters("localhost"))
-channel = connection.channel()
-channel.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
+def main():
+    global verificador
+    #python ms_lance.py [processos]: tamanho do pool de verificação
+    #(padrão: um por núcleo; 0 verifica na thread do consumidor)
+    processos = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    verificador = VerificadorParalelo(processos)
 
-for queue in ['lance_realizado', 'leilao_iniciado', 'leilao_finalizado']:
-    channel.queue_declare(queue=queue, exclusive=True)
-    channel.queue_bind(exchange=EXCHANGE_NAME, queue=queue, routing_key=queue)
+    connection = pika.BlockingConnection(pika.ConnectionParameters("localhost"))
+    channel = connection.channel()
+    channel.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
+    #prefetch + ack em lote; antes do ack, todos os lances do lote são verificados e decididos
+    consumidor = Consumidor(connection, channel,
+                            antes_do_ack=lambda: aplicar_lances(channel, verificador.drenar()))
 
-    if queue == 'lance_realizado':
-        cb = callback_lances
-    else:
-        cb = callback_leiloes
+    for queue in ['lance_realizado', 'leilao_iniciado', 'leilao_finalizado']:
+        channel.queue_declare(queue=queue, exclusive=True)
+        channel.queue_bind(exchange=EXCHANGE_NAME, queue=queue, routing_key=queue)
+
+        if queue == 'lance_realizado':
+            cb = callback_lances
+        else:
+            cb = callback_leiloes
+
+        consumidor.consumir(queue, cb)
+
+    print(' [*] Esperando novos leilões e lances.')
+    try:
+        consumidor.rodar()
+    finally:
+        verificador.fechar()
 
-    channel.basic_consume(queue=queue, on_message_callback=cb)
 
-print(' [*] Esperando novos leilões e lances.')
-channel.start_consuming()
+if __name__ == "__main__":
+    main()
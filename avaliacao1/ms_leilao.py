@@ -1,7 +1,12 @@
+import sys
+import json
+import heapq
+import itertools
 import random
+import threading
 from datetime import datetime, timedelta
 import pika
-import json
+from mensagens import codificar
 import time
 import os
 from rich.console import Console
@@ -61,15 +66,31 @@ leiloes_init = [
 EXCHANGE_NAME = "leilao_control"
 TEMPO_BASE = 20
 FORMATO_TIME = "%Y-%m-%d %H:%M:%S"
+INTERVALO_TELA = 1.0    # a tabela é redesenhada no máximo uma vez por intervalo
+MAX_LINHAS = 30         # linhas da tabela; com milhares de leilões o resto vira contagem
 console = Console()
+leiloes = {}                    # dict {id_leilao: leilao} dos leilões ainda não encerrados
+leiloes_lock = threading.Lock() # compartilhado entre o loop dos eventos e a thread da tela
+mudou = threading.Event()       # algum leilão mudou de status desde o último desenho
+publicados = 0                  # eventos publicados (exibido na tela)
 
 
 # ----- Interface do Terminal -----
+#A tela roda numa thread própria e só lê um retrato de leiloes, então o loop
+#dos eventos nunca espera por ela; com muitas transições seguidas, a tabela é
+#desenhada uma vez por INTERVALO_TELA
 def clear_terminal():
     os.system('cls' if os.name == 'nt' else 'clear')
 
 
 def mostrar_leiloes():
+    with leiloes_lock:
+        retrato = list(leiloes.values())
+        total_publicados = publicados
+    #ativos primeiro, depois os programados pelo horário de início
+    retrato.sort(key=lambda leilao: (leilao['status'] != "ativo", leilao['inicio'], leilao['id_leilao']))
+    ativos = sum(1 for leilao in retrato if leilao['status'] == "ativo")
+
     clear_terminal()
     table = Table(title="Leilões")
 
@@ -78,73 +99,142 @@ def mostrar_leiloes():
     table.add_column("Fim", style="magenta")
     table.add_column("Status", justify="right", style="yellow")
 
-    for leilao in leiloes:
+    for leilao in retrato[:MAX_LINHAS]:
         table.add_row(leilao['id_leilao'], leilao['inicio'][-8:], leilao['fim'][11:19], leilao['status'])
 
     console.print(table)
-    print(f"\rHorário: {datetime.now().strftime('%H:%M:%S')}", end='', flush=True)
+    if len(retrato) > MAX_LINHAS:
+        print(f"... e mais {len(retrato) - MAX_LINHAS} leilões")
+    print(f"{ativos} ativos, {len(retrato) - ativos} programados, {total_publicados} eventos publicados")
+
+
+def tela_worker():
+    while True:
+        #acorda a cada INTERVALO_TELA para o relógio, ou antes se algo mudou;
+        #mostrar_leiloes() é caro, então no máximo um desenho por intervalo
+        if mudou.wait(INTERVALO_TELA):
+            mudou.clear()
+            inicio = time.monotonic()
+            mostrar_leiloes()
+            time.sleep(max(0.0, INTERVALO_TELA - (time.monotonic() - inicio)))
+        print(f"\rHorário: {datetime.now().strftime('%H:%M:%S')}", end='', flush=True)
+
+
+# ----- Catálogo -----
+#python ms_leilao.py                -> leilões de exemplo (leiloes_init)
+#python ms_leilao.py catalogo.json  -> lista JSON de leilões com "id_leilao", "descricao"
+#                                      e, opcionalmente, "inicio" e "fim" no FORMATO_TIME
+#python ms_leilao.py 5000           -> 5000 leilões gerados
+def gerar_leiloes(n):
+    for i in range(1, n + 1):
+        yield {"id_leilao": str(i), "descricao": f"Lote {i}", "inicio": "", "fim": "", "status": ""}
+
+
+def carregar_catalogo(args):
+    if not args:
+        return leiloes_init
+    if args[0].isdigit():
+        return gerar_leiloes(int(args[0]))
+    with open(args[0], encoding="utf-8") as f:
+        return json.load(f)
 
 
 # ----- Inicialização -----
-#Gera tempos aleatórios para inicio e fim dos leiloes
+#Gera tempos aleatórios para inicio e fim dos leiloes sem datas,
 #com base no horário atual
 def atualizar_datas(leiloes):
     agora = datetime.now()
     for leilao in leiloes:
-        inicio = agora + timedelta(seconds=random.randint(0, TEMPO_BASE*2))
-        fim = inicio + timedelta(seconds=random.randint(TEMPO_BASE, TEMPO_BASE*4))
-
-        leilao["inicio"] = inicio.strftime(FORMATO_TIME)
-        leilao["fim"] = fim.strftime(FORMATO_TIME)
-    return sorted(leiloes, key=lambda x: datetime.strptime(x["inicio"], FORMATO_TIME))
+        if not leilao.get("inicio") or not leilao.get("fim"):
+            inicio = agora + timedelta(seconds=random.randint(0, TEMPO_BASE*2))
+            fim = inicio + timedelta(seconds=random.randint(TEMPO_BASE, TEMPO_BASE*4))
+
+            leilao["inicio"] = inicio.strftime(FORMATO_TIME)
+            leilao["fim"] = fim.strftime(FORMATO_TIME)
+        yield leilao
+
+
+#Heap de (instante, seq, routing_key, leilao) com as datas convertidas para
+#epoch uma única vez; seq desempata instantes iguais na ordem de inserção, então
+#o início de um leilão sempre sai antes do seu fim
+def montar_agenda(catalogo):
+    agenda = []
+    seq = itertools.count()
+    for leilao in atualizar_datas(catalogo):
+        #só os campos do leilão vão nas mensagens
+        leilao = {"id_leilao": str(leilao["id_leilao"]), "descricao": leilao["descricao"],
+                  "inicio": leilao["inicio"], "fim": leilao["fim"], "status": "programado"}
+        inicio = datetime.strptime(leilao["inicio"], FORMATO_TIME).timestamp()
+        fim = datetime.strptime(leilao["fim"], FORMATO_TIME).timestamp()
+        agenda.append((inicio, next(seq), "leilao_iniciado", leilao))
+        agenda.append((max(inicio, fim), next(seq), "leilao_finalizado", leilao))
+    heapq.heapify(agenda)
+    return agenda
+
+
+#Dorme até o próximo prazo e dispara, em ordem, todos os eventos vencidos.
+#dormir(segundos) é connection.sleep no serviço, que atende o RabbitMQ
+#(heartbeats) enquanto espera.
+def rodar_agenda(agenda, disparar, dormir):
+    while agenda:
+        espera = agenda[0][0] - time.time()
+        if espera > 0:
+            dormir(espera)
+            continue
+        instante, _, routing_key, leilao = heapq.heappop(agenda)
+        disparar(instante, routing_key, leilao)
 
 
 # ----- Controle dos Envios -----
 def enviar_leilao(leilao, RK):
-    message = json.dumps(leilao, ensure_ascii=False)
-    channel.basic_publish(exchange=EXCHANGE_NAME, routing_key=RK, body=message.encode("utf-8"))
-    print(f"\n [x] Leilao com ID: {leilao['id_leilao']} enviado para {RK}.", end='')
-
-
-def iniciar(leiloes):
-    mostrar_leiloes()
+    global publicados
+    content_type, body = codificar(leilao)
+    channel.basic_publish(exchange=EXCHANGE_NAME, routing_key=RK, body=body,
+                          properties=pika.BasicProperties(content_type=content_type))
+    with leiloes_lock:
+        publicados += 1
+
+
+def disparar_evento(instante, routing_key, leilao):
+    with leiloes_lock:
+        if routing_key == "leilao_iniciado":
+            leilao["status"] = "ativo"
+        else:
+            leilao["status"] = "encerrado"
+            leiloes.pop(leilao["id_leilao"], None)
+    enviar_leilao(leilao, routing_key)
+    mudou.set()
+
+
+def iniciar(agenda):
+    with leiloes_lock:
+        for _, _, routing_key, leilao in agenda:
+            if routing_key == "leilao_iniciado":
+                leiloes[leilao["id_leilao"]] = leilao
+    mudou.set()
+    threading.Thread(target=tela_worker, daemon=True).start()
     try:
-        while leiloes:
-            agora = datetime.now()
-            print(f"\rHorário: {agora.strftime('%H:%M:%S')}", end='', flush=True)
-
-            for leilao in leiloes[:]:
-                inicio = datetime.strptime(leilao["inicio"], FORMATO_TIME)
-                fim = datetime.strptime(leilao["fim"], FORMATO_TIME)
-
-                if agora >= inicio and leilao['status'] not in ["ativo", "encerrado"]:
-                    leilao["status"] = "ativo"
-                    enviar_leilao(leilao, "leilao_iniciado")
-                    mostrar_leiloes()
-
-                if agora >= fim and leilao['status'] == "ativo":
-                    leilao["status"] = "encerrado"
-                    enviar_leilao(leilao, "leilao_finalizado")
-                    leiloes.remove(leilao)
-                    mostrar_leiloes()
-            time.sleep(1)
+        rodar_agenda(agenda, disparar_evento, connection.sleep)
+        mostrar_leiloes()
     finally:
-        for leilao in leiloes:
-            if leilao['status'] == "ativo":
-                leilao['status'] = "encerrado"
-                enviar_leilao(leilao, "leilao_finalizado")
+        with leiloes_lock:
+            ativos = [leilao for leilao in leiloes.values() if leilao['status'] == "ativo"]
+        for leilao in ativos:
+            leilao['status'] = "encerrado"
+            enviar_leilao(leilao, "leilao_finalizado")
         connection.close()
         print("\n [*] Conexão com RabbitMQ encerrada.")
 
 
 # ----------
 
-leiloes = atualizar_datas(leiloes_init)
-connection = pika.BlockingConnection(pika.ConnectionParameters("localhost"))
-channel = connection.channel()
-channel.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
+if __name__ == "__main__":
+    agenda = montar_agenda(carregar_catalogo(sys.argv[1:]))
+    connection = pika.BlockingConnection(pika.ConnectionParameters("localhost"))
+    channel = connection.channel()
+    channel.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
 
-if "TERM" not in os.environ:
-    os.environ["TERM"] = "xterm-256color"
+    if "TERM" not in os.environ:
+        os.environ["TERM"] = "xterm-256color"
 
-iniciar(leiloes)
+    iniciar(agenda)
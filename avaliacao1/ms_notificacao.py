@@ -1,8 +1,16 @@
+import sys
+import collections
 import pika
-import json
+from pika.exceptions import NackError
+from mensagens import decodificar
+from consumidor import Consumidor
 
 
 EXCHANGE_NAME = "leilao_control"
+PREFETCH = 1024         # janela de entregas de onde sai cada lote
+LOTE = 256              # entregas por ack múltiplo da origem (e por conflação)
+TENTATIVAS = 3          # republicações de uma mensagem com nack do broker
+AVISO_A_CADA = 10000    # mensagens entre dois prints de estatística
 
 
 # ----- Controle dos Envios -----
@@ -14,27 +22,112 @@ EXCHANGE_NAME = "leilao_control"
 #     "venceu" True ou False (controlado por ms_lance)
 # }
 def callback(ch, method, properties, body):
-    lance = json.loads(body.decode("utf-8"))
+    lance = decodificar(body, properties.content_type)
 
     if not lance['venceu']:
         print(f" [x] Mensagem recebida de lance_validado.")
     else:
         print(f" [v] Mensagem recebida de leilao_vencedor.")
 
-    channel.basic_publish(exchange=EXCHANGE_NAME, routing_key=f"leilao_{lance['item']}", body=body)
-    ch.basic_ack(delivery_tag=method.delivery_tag)
+    # repassa o corpo como veio, com o mesmo content_type
+    ch.basic_publish(exchange=EXCHANGE_NAME, routing_key=f"leilao_{lance['item']}", body=body,
+                     properties=properties)
+
+
+# ----- Repasse Confirmado -----
+#Os callbacks só guardam a mensagem; o lote é publicado no canal de saída,
+#com publisher confirms, pelo antes_do_ack do Consumidor, então o ack
+#múltiplo das entregas de origem só sai depois de o broker confirmar o
+#repasse (pelo menos uma vez). No BlockingChannel cada basic_publish espera o
+#próprio confirm, sem várias publicações em voo: o modo troca vazão por
+#garantia de entrega, e o que ele economiza vem só da conflação. Dentro de um
+#lote, um lance de um leilão torna obsoletos os anteriores do mesmo leilão
+#(o ms_lance só valida lances maiores), então só o último é repassado; o
+#vencedor nunca é descartado e vai depois dele.
+#Cada mensagem só sai do lote depois de confirmada. Se o broker recusar uma
+#delas TENTATIVAS vezes, o lote fica sem ack e o Consumidor para: as filas de
+#origem são duráveis, então as entregas voltam para a fila e são repassadas
+#de novo quando o serviço reinicia.
+class Repasse:
+    def __init__(self, ch_saida):
+        self.ch_saida = ch_saida
+        self._ultimo_lance = {}     # item -> (body, properties), na ordem de chegada
+        self._vencedores = []       # (item, body, properties)
+        self._a_publicar = collections.deque()      # lote fechado, ainda sem confirm
+        self.recebidas = 0
+        self.repassadas = 0
+        self.descartadas = 0
+        self._proximo_aviso = AVISO_A_CADA
+
+    def guardar(self, ch, method, properties, body):
+        lance = decodificar(body, properties.content_type)
+        self.recebidas += 1
+        if lance['venceu']:
+            self._vencedores.append((lance['item'], body, properties))
+        else:
+            if lance['item'] in self._ultimo_lance:
+                self.descartadas += 1
+            self._ultimo_lance[lance['item']] = (body, properties)
+
+    def publicar_lote(self):
+        self._a_publicar.extend((item, body, properties) for item, (body, properties) in self._ultimo_lance.items())
+        self._a_publicar.extend(self._vencedores)
+        self._ultimo_lance = {}
+        self._vencedores = []
+        while self._a_publicar:
+            if not self._publicar(*self._a_publicar[0]):
+                return False    # sem ack: o Consumidor para
+            self._a_publicar.popleft()
+            self.repassadas += 1
+        if self.recebidas >= self._proximo_aviso:
+            self._proximo_aviso += AVISO_A_CADA
+            print(f" [i] {self.recebidas} recebidas, {self.repassadas} repassadas, {self.descartadas} obsoletas")
+
+    def _publicar(self, item, body, properties):
+        for tentativa in range(TENTATIVAS):
+            try:
+                # com confirm_delivery, volta quando o broker confirmou
+                self.ch_saida.basic_publish(exchange=EXCHANGE_NAME, routing_key=f"leilao_{item}", body=body,
+                                            properties=properties)
+                return True
+            except NackError:
+                print(f" [!] Broker recusou repasse para leilao_{item} (tentativa {tentativa + 1})")
+        return False
 
 
 # ----------
 
+#python ms_notificacao.py [confirmado|direto]: confirmado (padrão) conflaciona
+#e repassa com confirm de cada publicação; direto repassa mensagem a mensagem,
+#sem confirms, como antes
+modo = sys.argv[1] if len(sys.argv) > 1 else "confirmado"
 connection = pika.BlockingConnection(pika.ConnectionParameters("localhost"))
 channel = connection.channel()
 channel.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
 
-for queue in ['lance_validado', 'leilao_vencedor']:
-    channel.queue_declare(queue=queue, exclusive=True)
-    channel.queue_bind(exchange=EXCHANGE_NAME, queue=queue, routing_key=queue)
-    channel.basic_consume(queue=queue, on_message_callback=callback)
+if modo == "direto":
+    consumidor = Consumidor(connection, channel)    # prefetch + ack em lote depois de processar
+    cb = callback
+else:
+    canal_saida = connection.channel()
+    canal_saida.confirm_delivery()
+    repasse = Repasse(canal_saida)
+    consumidor = Consumidor(connection, channel, prefetch=PREFETCH, lote_ack=LOTE,
+                            antes_do_ack=repasse.publicar_lote)
+    cb = repasse.guardar
+
+#Filas de origem duráveis e nomeadas: o que não teve ack (queda do serviço ou
+#lote recusado pelo broker) continua na fila e é reentregue
+for routing_key in ['lance_validado', 'leilao_vencedor']:
+    queue = f"ms_notificacao_{routing_key}"
+    channel.queue_declare(queue=queue, durable=True)
+    channel.queue_bind(exchange=EXCHANGE_NAME, queue=queue, routing_key=routing_key)
+    consumidor.consumir(queue, cb)
 
-print(' [*] Esperando novos lances.')
-channel.start_consuming()
+print(f' [*] Esperando novos lances (modo {modo}).')
+try:
+    consumidor.rodar()
+    if consumidor.parado:
+        print(" [!] Repasse recusado pelo broker; lote deixado na fila para reentrega.")
+finally:
+    connection.close()
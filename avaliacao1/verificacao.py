@@ -0,0 +1,77 @@
+import collections
+from concurrent.futures import ProcessPoolExecutor
+from chaves import CacheChaves
+
+cache_chaves = CacheChaves()    # um cache por processo (cada worker do pool tem o seu)
+
+
+# ----- Verificação das Assinaturas -----
+#dados: bytes exatamente como foram assinados pelo cliente (sem re-serializar)
+def verifica_assinatura(cliente_id, dados, assinatura):
+    consultas = cache_chaves.hits + cache_chaves.misses
+    try:
+        verificar = cache_chaves.verificador(cliente_id)    # RSA ou Ed25519, conforme o cliente
+        verificar(dados, assinatura)
+        return True
+    except (ValueError, TypeError) as e:
+        print(f"\n [!] Erro ao verificar assinatura de lance (Cliente:{cliente_id}): {e}")
+        return False
+    except FileNotFoundError:
+        print(f"\n [!] Chave pública do cliente {cliente_id} não encontrada.")
+        return False
+    finally:
+        #Só quando esta consulta levou o contador a um múltiplo de 1000 (sem chave
+        #pública o contador não anda, e o aviso sairia a cada lance)
+        total = cache_chaves.hits + cache_chaves.misses
+        if total != consultas and total % 1000 == 0:
+            print(f" [i] Cache de chaves: {cache_chaves.estatisticas()}")
+
+
+# ----- Pool de Verificação -----
+#As assinaturas são verificadas em paralelo num pool de processos (RSA é CPU
+#puro e o GIL limitaria threads), mas os resultados saem na ordem de chegada:
+#prontos() só entrega a cabeça da fila quando ela terminou e drenar() espera
+#todos. Quem decide o melhor lance continua sendo uma única thread, então os
+#lances de um mesmo leilão são aplicados na ordem em que chegaram.
+#processos=0 verifica na própria thread (sem pool).
+class VerificadorParalelo:
+    def __init__(self, processos=None):
+        self._pool = ProcessPoolExecutor(max_workers=processos) if processos != 0 else None
+        self._pendentes = collections.deque()      # (future ou resultado, item) em ordem de chegada
+
+    def enviar(self, cliente_id, dados, assinatura, item):
+        if self._pool is None:
+            self._pendentes.append((verifica_assinatura(cliente_id, dados, assinatura), item))
+        else:
+            self._pendentes.append((self._pool.submit(verifica_assinatura, cliente_id, dados, assinatura), item))
+
+    def __len__(self):
+        return len(self._pendentes)
+
+    def prontos(self):
+        #(ok, item) já verificados na cabeça da fila, sem bloquear
+        while self._pendentes:
+            resultado, item = self._pendentes[0]
+            if not isinstance(resultado, bool) and not resultado.done():
+                return
+            self._pendentes.popleft()
+            yield self._resultado(resultado), item
+
+    def drenar(self):
+        #(ok, item) de todos os pendentes, esperando os que faltam
+        while self._pendentes:
+            resultado, item = self._pendentes.popleft()
+            yield self._resultado(resultado), item
+
+    def _resultado(self, resultado):
+        if isinstance(resultado, bool):
+            return resultado
+        try:
+            return resultado.result()
+        except Exception as e:
+            print(f"\n [!] Falha no worker de verificação: {e}")
+            return False
+
+    def fechar(self):
+        if self._pool is not None:
+            self._pool.shutdown()
@@ -0,0 +1,76 @@
+import sys
+import time
+import threading
+import Pyro5.api
+import Pyro5.nameserver
+import peer
+
+# Tempo para entrar na sc (uma rodada de "requisitar" que concede o recurso)
+# conforme cresce o número de peers, com as chamadas em sequência (como
+# executar_acao fazia, resolvendo PYRONAME: a cada peer) e em paralelo.
+# Os peers são objetos locais num Daemon próprio que respondem True depois de
+# LATENCIA segundos; com "travados" > 0, alguns deles demoram mais que o prazo
+# da ação (peer.TIMEOUT_ACAO, reduzido aqui para não levar minutos).
+# Uso: python bench_sc.py [latencia_ms] [travados]
+LATENCIA = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.005
+TRAVADOS = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+TAMANHOS = [1, 2, 4, 8, 16, 32]
+REPETICOES = 5
+peer.TIMEOUT_ACAO = 1
+
+
+@Pyro5.api.expose
+class PeerFalso(object):
+    def __init__(self, atraso):
+        self.atraso = atraso
+
+    def requisitar(self, peer_name, timestamp):
+        time.sleep(self.atraso)
+        return True
+
+
+def sequencial(lista, *args):
+    # executar_acao antes da mudança, só para "requisitar"
+    flag = True
+    for peer_name in lista:
+        try:
+            with Pyro5.api.Proxy(f"PYRONAME:{peer_name}") as p:
+                p._pyroTimeout = peer.TIMEOUT_ACAO
+                if not p.requisitar(*args):
+                    flag = False
+        except Exception:
+            continue
+    return flag
+
+
+def medir(funcao, nomes):
+    inicio = time.perf_counter()
+    for _ in range(REPETICOES):
+        funcao(nomes)
+    return (time.perf_counter() - inicio) / REPETICOES
+
+
+def main():
+    threading.Thread(target=Pyro5.nameserver.start_ns_loop, daemon=True).start()
+    time.sleep(1)
+    ns = Pyro5.api.locate_ns()
+    daemon = Pyro5.api.Daemon()
+    threading.Thread(target=daemon.requestLoop, daemon=True).start()
+
+    nomes = []
+    for i in range(max(TAMANHOS)):
+        atraso = peer.TIMEOUT_ACAO * 1.5 if i < TRAVADOS else LATENCIA
+        nome = f"bench{i}.peers"
+        ns.register(nome, daemon.register(PeerFalso(atraso)))
+        nomes.append(nome)
+
+    args = ("bench.peers", "2000-01-01 00:00:00.000000")
+    print(f"latência por peer {LATENCIA * 1000:.0f}ms, {TRAVADOS} travados, prazo {peer.TIMEOUT_ACAO}s")
+    for n in TAMANHOS:
+        seq = medir(lambda lista: sequencial(lista, *args), nomes[:n])
+        par = medir(lambda lista: peer.executar_acao("requisitar", lista, *args), nomes[:n])
+        print(f"{n:3d} peers  sequencial {seq * 1000:8.1f}ms  paralelo {par * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import threading
 import time
+import concurrent.futures
 import Pyro5.api
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime, timedelta
@@ -36,8 +37,14 @@ CLEANUP_INTERVAL = 3
 TIMEOUT_BEATS = 5
 TIMEOUT_ACAO = 10
 LIMITE_USO_RECURSO = 30
+MAX_CHAMADAS = 16                       # chamadas remotas simultâneas
 # ------------------
 
+pool_chamadas = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_CHAMADAS, thread_name_prefix="chamadas")
+# heartbeats para peers travados não podem ocupar as vagas de requisitar/responder
+pool_heartbeat = concurrent.futures.ThreadPoolExecutor(max_workers=MAX_CHAMADAS, thread_name_prefix="heartbeat")
+NAO_CONTATADO = object()                # chamada que não chegou a sair antes do prazo
+
 # ----- Utilitários -----
 def set_status(op):
     global meu_status
@@ -150,7 +157,15 @@ def pedir_recurso(client):
 
         concedido = False
         while not concedido:
-            concedido = executar_acao("requisitar", peers, client, timestamp)
+            concedido = True
+            pendentes = peers
+            while pendentes:
+                # quem não foi contatado não sabe do pedido e nunca vai responder:
+                # pede de novo na hora em vez de esperar minha_vez
+                nao_contatados = []
+                if not executar_acao("requisitar", pendentes, client, timestamp, nao_contatados=nao_contatados):
+                    concedido = False
+                pendentes = nao_contatados
             if concedido:
                 entrar_sc(client)
                 break
@@ -207,33 +222,83 @@ def liberar_recurso():
 
 
 # ----- Comunicação -----
-def executar_acao(method_name, lista, *args):
+def resolver(nomes):
+    # uma única consulta ao NameServer para todos os peers, em vez de
+    # resolver um PYRONAME: a cada chamada
+    try:
+        with Pyro5.api.locate_ns() as ns:
+            registrados = ns.list()
+    except Exception:
+        return {}
+    return {nome: registrados[nome] for nome in nomes if nome in registrados}
+
+
+def chamar(uri, method_name, args, prazo):
+    # o timeout da chamada é o que sobra do prazo da ação; se a vaga no pool só
+    # apareceu depois do prazo, a chamada não é feita (a decisão já foi tomada)
+    restante = prazo - time.monotonic()
+    if restante <= 0:
+        return NAO_CONTATADO
+    with Pyro5.api.Proxy(uri) as peer:
+        peer._pyroTimeout = restante
+        return getattr(peer, method_name)(*args)
+
+
+def executar_acao(method_name, lista, *args, uris=None, nao_contatados=None):
     # executa um método remoto em todos os peers da lista
     # com lista de argumentos flexível
-    # Também atualiza as listas de acordo com o método
-    flag = True
+    # As chamadas saem em paralelo (no máximo MAX_CHAMADAS por vez) e todas
+    # dividem o mesmo prazo de TIMEOUT_ACAO, então entrar na sc custa uma
+    # rodada e um peer morto atrasa no máximo TIMEOUT_ACAO, não N vezes isso.
+    # Os resultados são aplicados depois, nesta thread, e atualizam as
+    # listas de acordo com o método
+    if uris is None:
+        uris = resolver(lista)
+    # Uma chamada que nem começou até o prazo é cancelada e conta como "não
+    # contatado": o peer não é dado como morto, as listas não mudam e o nome
+    # vai para nao_contatados, para quem chamou refazer só esses pedidos
+    pool = pool_heartbeat if method_name == "heartbeat" else pool_chamadas
+    prazo = time.monotonic() + TIMEOUT_ACAO
+    futuros = {}
     for peer_name in lista:
+        if peer_name in uris:       # peer fora do NameServer é ignorado, como antes
+            futuros[peer_name] = pool.submit(chamar, uris[peer_name], method_name, args, prazo)
+    concurrent.futures.wait(futuros.values(), timeout=max(0, prazo - time.monotonic()))
+
+    flag = True
+    for peer_name, futuro in futuros.items():
         try:
-            with Pyro5.api.Proxy(f"PYRONAME:{peer_name}") as peer:
-                peer._pyroTimeout = TIMEOUT_ACAO
-                try:
-                    method = getattr(peer, method_name)
-                    if not method(*args):
-                        flag = False
-                        if method_name == "requisitar":
-                            adicionar_na_lista(peer_name, 'e')
-                    if method_name == "responder":
-                        remover_da_lista(peer_name, 'p')
-                except Pyro5.errors.TimeoutError:
-                    print(f"\n{peer} timeout ao {method_name}.")
-                    with ativos_lock:
-                        peers_ativos.pop(peer, None)
-                    if method_name == "requisitar":
-                        remover_da_lista(peer_name, 'e')
-                    if method_name == "responder":
-                        remover_da_lista(peer_name, 'p')
+            if not futuro.done() and futuro.cancel():
+                resultado = NAO_CONTATADO
+            elif not futuro.done():
+                # em andamento além do prazo: o peer foi contatado e não respondeu
+                raise Pyro5.errors.TimeoutError("prazo da ação esgotado")
+            else:
+                resultado = futuro.result()
+        except Pyro5.errors.TimeoutError:
+            print(f"\n{peer_name} timeout ao {method_name}.")
+            with ativos_lock:
+                peers_ativos.pop(peer_name, None)
+            if method_name == "requisitar":
+                remover_da_lista(peer_name, 'e')
+            if method_name == "responder":
+                remover_da_lista(peer_name, 'p')
+            continue
         except:
             continue
+        if resultado is NAO_CONTATADO:
+            print(f"\n{peer_name} não contatado ao {method_name} (sem vaga antes do prazo).")
+            if nao_contatados is not None:
+                nao_contatados.append(peer_name)
+            elif method_name == "requisitar":
+                flag = False
+            continue
+        if not resultado:
+            flag = False
+            if method_name == "requisitar":
+                adicionar_na_lista(peer_name, 'e')
+        if method_name == "responder":
+            remover_da_lista(peer_name, 'p')
     return flag
 
 
@@ -315,9 +380,11 @@ def interface_usuario(client):
 def heart(client):
     registro.wait()
     ns = Pyro5.api.locate_ns()
-    lista = list(ns.list().keys())
+    registrados = ns.list()
+    lista = list(registrados.keys())
     lista.remove("Pyro.NameServer")
-    executar_acao("heartbeat", lista, client, get_status(), datetime.now().strftime(FORMAT_DATETIME))
+    executar_acao("heartbeat", lista, client, get_status(), datetime.now().strftime(FORMAT_DATETIME),
+                  uris=registrados)
 
 
 def cleanup(client):
@@ -1,53 +1,125 @@
+import sys
 import threading
-import json
+import collections
 import time
-import queue
 import logging
 from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-import requests
 import pika
+from cliente_backend import ClienteBackend, BackendIndisponivel, repassar
+from indice_interesses import IndiceInteresses
+from vinculos_leiloes import VinculosLeiloes
+from consumidor import Consumidor
+from mensagens import decodificar
+from particoes import shard_do_leilao, porta_shard
+from eventos_sse import montar_frame, chave_conflacao, FilaSSE, HistoricoEventos, reenviar
 
 MS_LEILAO_URL = "http://localhost:5001"
-MS_LANCE_URL  = "http://localhost:5002"
 MS_PAG_URL    = "http://localhost:5003"
 RABBITMQ_HOST = "localhost"
 EXCHANGE_NAME = "leilao_control"
+ARGS = sys.argv[1:] if __name__ == "__main__" else []     # python <gateway>.py [porta] [shards_lance]
+PORT = int(ARGS[0]) if len(ARGS) > 0 else 5000              # várias instâncias: uma porta por processo
+N_SHARDS_LANCE = int(ARGS[1]) if len(ARGS) > 1 else 1       # processos do ms_lance (particoes.py)
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=["X-Proximo-Cursor", "X-Revisao"])
 logging.basicConfig(level=logging.INFO)
-interesses = {}
-interesses_lock = threading.Lock()
-filas_sse = {}
+historico = HistoricoEventos()      # eventos recentes por leilão, para retomar com Last-Event-ID
+interesses = IndiceInteresses(ao_mudar=lambda leilao: vinculos.mudou(leilao))    # leilao <-> clientes
+vinculos = VinculosLeiloes(EXCHANGE_NAME, interesses, historico)                # bindings leilao_<id> no RabbitMQ
+filas_sse = {}                      # cliente -> FilaSSE
 filas_sse_lock = threading.Lock()
+MAX_PENDENTES_SSE = 100             # frames pendentes antes de desconectar um cliente lento
+MAX_ATRASO_SSE = 30.0               # segundos sem esvaziar a fila antes de desconectar
+TEMPO_GRACA = 30.0                  # segundos que os interesses de um cliente desconectado são mantidos
+remocoes = {}                       # cliente desconectado -> Timer da remoção dos interesses
+
+CACHE_TTL = 1.0                             # segundos sem revalidar uma entrada com o ms_leilao
+CACHE_MAX = 1000                            # entradas (uma por caminho + query string)
+HEADERS_CACHE = ["Content-Type", "ETag", "X-Revisao", "X-Proximo-Cursor", "Cache-Control"]
+cache_leiloes = collections.OrderedDict()   # full_path -> resposta do ms_leilao
+cache_lock = threading.Lock()
+
+backend_leilao = ClienteBackend("ms_leilao", MS_LEILAO_URL)
+backends_lance = [ClienteBackend(f"ms_lance[{i}]", f"http://localhost:{porta_shard(i, N_SHARDS_LANCE)}")
+                  for i in range(N_SHARDS_LANCE)]
 
 
 # ----- Utilitários -----
-def enviar_evento_cliente(client, evento, data):
+def enviar_evento_cliente(client, frame, chave=None):
     with filas_sse_lock:
         fila = filas_sse.get(client)
-    if fila:
-        payload = {"event": evento, "data": data}
-        try:
-            fila.put_nowait(payload)
-        except queue.Full:
-            logging.warning(f"Fila do cliente {client} cheia")
+    if fila and not fila.lento and not fila.colocar(frame, chave):
+        logging.warning(f"Cliente {client} lento demais, desconectando: {fila.metricas()}")
 
 
 def broadcast_interessados(leilao, evento, data):
-    lista = []
-    with interesses_lock:
-        for cliente, leiloes in interesses.items():
-            if leilao in leiloes:
-                lista.append(cliente)
+    # registrar no histórico e escolher os assinantes sob o mesmo lock do
+    # reenvio: cada evento vai ou no reenvio ou ao vivo, nunca nos dois
+    with historico.lock:
+        _, frame = historico.registrar(leilao, evento, data)
+        with filas_sse_lock:
+            lista = [cliente for cliente in interesses.assinantes(leilao)
+                     if cliente not in filas_sse or not filas_sse[cliente].aguarda_reenvio(leilao)]
     if lista:
         logging.info(
             f"BROADCAST -> Enviando evento {evento} do leilão {leilao} para {len(lista)} clientes.")
     else:
-        logging.warning(
-            f"BROADCAST -> Nenhum cliente interessado para o leilão {leilao}. Clientes registrados: {interesses.keys()}")
+        logging.warning(f"BROADCAST -> Nenhum cliente interessado para o leilão {leilao}.")
+        return
+    chave = chave_conflacao(evento, leilao)
     for cliente in lista:
-        enviar_evento_cliente(cliente, evento, data)
+        enviar_evento_cliente(cliente, frame, chave)
+
+
+def broadcast_todos(evento, data):
+    # eventos sem leilão ficam no histórico sob a chave None
+    with historico.lock:
+        _, frame = historico.registrar(None, evento, data)
+        with filas_sse_lock:
+            clientes = list(filas_sse.keys())
+    for cliente in clientes:
+        enviar_evento_cliente(cliente, frame)
+
+
+def consultar_catalogo(caminho):
+    # Cache das consultas ao catálogo: várias abas pedindo a mesma URL no mesmo
+    # segundo compartilham uma resposta, e a revalidação com o ms_leilao usa
+    # If-None-Match (304 sem serializar nada). O cliente que já tem a revisão
+    # atual recebe 304 direto do gateway.
+    chave = request.full_path
+    agora = time.monotonic()
+    with cache_lock:
+        entrada = cache_leiloes.get(chave)
+    if entrada is None or agora - entrada["validado_em"] >= CACHE_TTL:
+        headers = {}
+        if entrada is not None and entrada["revisao"]:
+            headers["If-None-Match"] = f'"{entrada["revisao"]}"'
+        resp = backend_leilao.get(caminho, params=request.args, headers=headers)
+        if resp.status_code == 304 and entrada is not None:
+            entrada = dict(entrada, validado_em=agora)
+        else:
+            entrada = {
+                "revisao": resp.headers.get("X-Revisao"),
+                "status": resp.status_code,
+                "content": resp.content,
+                "headers": [(h, resp.headers[h]) for h in HEADERS_CACHE if h in resp.headers],
+                "validado_em": agora
+            }
+        with cache_lock:
+            cache_leiloes[chave] = entrada
+            cache_leiloes.move_to_end(chave)
+            while len(cache_leiloes) > CACHE_MAX:
+                cache_leiloes.popitem(last=False)
+    if entrada["status"] == 200 and entrada["revisao"] and request.if_none_match.contains(entrada["revisao"]):
+        return "", 304, entrada["headers"]
+    return entrada["content"], entrada["status"], entrada["headers"]
+
+
+@app.errorhandler(BackendIndisponivel)
+def backend_indisponivel(e):
+    logging.warning(str(e))
+    return jsonify({"error": f"{e.backend} indisponivel"}), 503
 
 
 # ----- Endpoints -----
@@ -56,14 +128,21 @@ def criar_leilao():
     payload = request.get_json()
     if not payload:
         return jsonify({"error": "JSON body required"}), 400
-    resp = requests.post(f"{MS_LEILAO_URL}/leiloes", json=payload)
-    return resp.content, resp.status_code, resp.headers.items()
+    resp = backend_leilao.post("/leiloes", json=payload)
+    if resp.ok:
+        with cache_lock:
+            cache_leiloes.clear()
+    return repassar(resp)
 
 
 @app.route("/leiloes", methods=["GET"])
 def listar_leiloes():
-    resp = requests.get(f"{MS_LEILAO_URL}/leiloes")
-    return resp.content, resp.status_code, resp.headers.items()
+    return consultar_catalogo("/leiloes")
+
+
+@app.route("/leiloes/delta", methods=["GET"])
+def delta_leiloes():
+    return consultar_catalogo("/leiloes/delta")
 
 
 @app.route("/lances", methods=["POST"])
@@ -71,8 +150,10 @@ def efetuar_lance():
     payload = request.get_json()
     if not payload:
         return jsonify({"error": "JSON body required"}), 400
-    resp = requests.post(f"{MS_LANCE_URL}/lances", json=payload)
-    return resp.content, resp.status_code, resp.headers.items()
+    # cada leilão tem um único shard dono, que decide seus lances
+    backend = backends_lance[shard_do_leilao(payload.get("leilao"), N_SHARDS_LANCE)]
+    resp = backend.post("/lances", json=payload)
+    return repassar(resp)
 
 
 @app.route("/interesse", methods=["POST"])
@@ -83,9 +164,17 @@ def registrar_interesse():
     cliente = data["cliente"]
     leilao = data["leilao"]
 
-    with interesses_lock:
-        interesses.setdefault(cliente, set()).add(leilao)
-
+    interesses.registrar(cliente, leilao)
+    # só responde depois do bind, para o cliente não perder o que for publicado em seguida
+    if not vinculos.esperar(leilao):
+        logging.warning(f"Sem bind para o leilão {leilao}: eventos publicados agora podem não chegar a {cliente}")
+    with historico.lock:
+        with filas_sse_lock:
+            fila = filas_sse.get(cliente)
+        if fila is not None:
+            # cliente reconectou com Last-Event-ID: reenvia o que perdeu desse
+            # leilão, incluindo o que chegou durante o bind (não foi ao vivo)
+            reenviar(historico, fila, [leilao])
     logging.info("Cliente %s registrado para leilao %s", cliente, leilao)
     return jsonify({"ok": True})
 
@@ -98,32 +187,70 @@ def cancelar_interesse():
     cliente = data["cliente"]
     leilao = data["leilao"]
 
-    with interesses_lock:
-        if cliente in interesses and leilao in interesses[cliente]:
-            interesses[cliente].remove(leilao)
+    interesses.cancelar(cliente, leilao)
     logging.info(f"Cliente {cliente} não possui mais interesse no leilao {leilao}")
     return jsonify({"ok": True})
 
 
+@app.route("/sse/metricas")
+def metricas_sse():
+    with filas_sse_lock:
+        filas = list(filas_sse.items())
+    return jsonify({cliente: fila.metricas() for cliente, fila in filas})
+
+
+def ultimo_id_evento():
+    # Last-Event-ID vem no header quando o EventSource reconecta sozinho, ou
+    # em ?last_event_id= quando a página abre um EventSource novo
+    valor = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    try:
+        return int(valor) if valor else None
+    except ValueError:
+        return None
+
+
+def adiar_remocao(cliente):
+    # Chamado com filas_sse_lock. O EventSource reconecta em poucos segundos:
+    # até lá os interesses e os bindings ficam, e o que for publicado nesse
+    # intervalo entra no histórico para o reenvio pelo Last-Event-ID
+    timer = threading.Timer(TEMPO_GRACA, lambda: remover_desconectado(cliente, timer))
+    timer.daemon = True
+    remocoes[cliente] = timer
+    timer.start()
+
+
+def remover_desconectado(cliente, timer):
+    with filas_sse_lock:
+        if remocoes.get(cliente) is not timer or cliente in filas_sse:
+            return      # reconectou (ou desconectou de novo e há outro timer)
+        del remocoes[cliente]
+        interesses.remover_cliente(cliente)
+    logging.info(f"Interesses do cliente SSE {cliente} removidos após {TEMPO_GRACA}s desconectado")
+
+
 @app.route("/sse/<cliente>")
 def sse_stream(cliente):
-    fila = queue.Queue(maxsize=100)
-    with filas_sse_lock:
-        filas_sse[cliente] = fila
-    logging.info(f"Cliente SSE conectado: {cliente} (Fila registrada)")
+    fila = FilaSSE(max_pendentes=MAX_PENDENTES_SSE, max_atraso=MAX_ATRASO_SSE)
+    fila.retomar_de = ultimo_id_evento()
+    with historico.lock:
+        with filas_sse_lock:
+            filas_sse[cliente] = fila
+            timer = remocoes.pop(cliente, None)
+            if timer is not None:
+                timer.cancel()
+        reenviar(historico, fila, interesses.leiloes_do_cliente(cliente) | {None})
+    logging.info(f"Cliente SSE conectado: {cliente} (Fila registrada, retomando de {fila.retomar_de})")
 
     def event_stream():
         try:
-            yield f"event: connected\ndata: {json.dumps({'msg': 'connected', 'cliente': cliente})}\n\n"
+            yield montar_frame("connected", {"msg": "connected", "cliente": cliente})
             while True:
-                try:
-                    item = fila.get(timeout=15)
-                    evento = item["event"]
-                    data = item["data"]
-                    yield f"event: {evento}\n"
-                    yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
-                except queue.Empty:
-                    yield "\n"
+                # uma escrita com todos os frames pendentes
+                frames = fila.retirar(timeout=15)
+                if fila.lento:
+                    logging.warning(f"Encerrando stream SSE do cliente lento {cliente}")
+                    break
+                yield frames if frames is not None else b"\n"
 
         except GeneratorExit:
             logging.info(f"Cliente SSE desconectado (generator exit): {cliente}")
@@ -134,6 +261,7 @@ def sse_stream(cliente):
             with filas_sse_lock:
                 if filas_sse.get(cliente) is fila:
                     del filas_sse[cliente]
+                    adiar_remocao(cliente)
                     logging.info(f"Limpeza do cliente SSE finalizada e removida de filas_sse: {cliente}")
                 else:
                     logging.warning(f"Fila do cliente {cliente} já foi substituída ou removida. Limpeza ignorada.")
@@ -151,14 +279,15 @@ def comunicacao_interna():
     result = ch.queue_declare(queue='', exclusive=True)
     fila = result.method.queue
 
-    routing_keys = ['lance_validado', 'lance_invalidado', 'leilao_vencedor', 'link_pagamento', 'status_pagamento']
-    for rk in routing_keys:
-        ch.queue_bind(exchange=EXCHANGE_NAME, queue=fila, routing_key=rk)
+    # eventos de leilão chegam por leilao_<id>, com bind só dos leilões com
+    # clientes nesta instância; status_pagamento não tem leilão e vai para todos
+    ch.queue_bind(exchange=EXCHANGE_NAME, queue=fila, routing_key='status_pagamento')
+    vinculos.iniciar(conn, ch, fila)
 
     def callback(ch, method, properties, body):
         try:
-            evento = method.routing_key
-            payload = json.loads(body.decode("utf-8"))
+            evento = properties.type or method.routing_key
+            payload = decodificar(body, properties.content_type)
             logging.info(f"Evento RabbitMQ recebido: {evento} -> {payload}")
 
             if 'leilao' in payload:
@@ -173,18 +302,15 @@ def comunicacao_interna():
                 else:
                     broadcast_interessados(leilao, evento, payload)
             else:
-                with filas_sse_lock:
-                    for cid in list(filas_sse.keys()):
-                        enviar_evento_cliente(cid, evento, payload)
+                broadcast_todos(evento, payload)
         except Exception as e:
             logging.exception(f"Erro ao processar evento RabbitMQ: {e}")
-        finally:
-            ch.basic_ack(delivery_tag=method.delivery_tag)
 
-    ch.basic_consume(queue=fila, on_message_callback=callback)
+    consumidor = Consumidor(conn, ch)
+    consumidor.consumir(fila, callback)
 
     try:
-        ch.start_consuming()
+        consumidor.rodar()
     except Exception as e:
         logging.exception(f"RabbitMQ finalizado com erro: {e}")
     finally:
@@ -202,4 +328,4 @@ def iniciar_consumo():
 
 if __name__ == "__main__":
     iniciar_consumo()
-    app.run(host="0.0.0.0", port=5000, threaded=True)
+    app.run(host="0.0.0.0", port=PORT, threaded=True)
@@ -0,0 +1,289 @@
+import sys
+import asyncio
+import threading
+import logging
+import pika
+from aiohttp import web, ClientSession, ClientTimeout, TCPConnector, ClientError, ClientConnectorError
+from indice_interesses import IndiceInteresses
+from vinculos_leiloes import VinculosLeiloes
+from consumidor import Consumidor
+from mensagens import decodificar
+from particoes import shard_do_leilao, porta_shard
+from eventos_sse import montar_frame, chave_conflacao, FilaSSE, HistoricoEventos, reenviar
+
+# Modo assíncrono (aiohttp) do API Gateway, com os mesmos endpoints do API_gateway.py.
+# Cada conexão SSE é uma task leve esperando numa asyncio.Queue, em vez de uma
+# thread do Flask bloqueada. O consumidor RabbitMQ continua numa thread própria
+# e repassa os eventos para o event loop com call_soon_threadsafe, então todo o
+# estado (interesses, filas_sse) só é tocado pelo loop e dispensa locks.
+MS_LEILAO_URL = "http://localhost:5001"
+RABBITMQ_HOST = "localhost"
+EXCHANGE_NAME = "leilao_control"
+ARGS = sys.argv[1:] if __name__ == "__main__" else []     # python <gateway>.py [porta] [shards_lance]
+PORT = int(ARGS[0]) if len(ARGS) > 0 else 5000              # várias instâncias: uma porta por processo
+N_SHARDS_LANCE = int(ARGS[1]) if len(ARGS) > 1 else 1       # processos do ms_lance (particoes.py)
+MS_LANCE_URLS = [f"http://localhost:{porta_shard(i, N_SHARDS_LANCE)}" for i in range(N_SHARDS_LANCE)]
+MAX_PENDENTES_SSE = 100
+MAX_ATRASO_SSE = 30.0
+KEEPALIVE_SSE = 15
+TEMPO_GRACA = 30.0      # segundos que os interesses de um cliente desconectado são mantidos
+MAX_CONEXOES_BACKEND = 100
+TIMEOUT_BACKEND = ClientTimeout(total=5, connect=1)
+HEADERS_REPASSADOS = ["Content-Type", "ETag", "X-Revisao", "X-Proximo-Cursor", "Cache-Control"]
+logging.basicConfig(level=logging.INFO)
+historico = HistoricoEventos()      # eventos recentes por leilão, para retomar com Last-Event-ID
+interesses = IndiceInteresses(ao_mudar=lambda leilao: vinculos.mudou(leilao))    # leilao <-> clientes
+vinculos = VinculosLeiloes(EXCHANGE_NAME, interesses, historico)                # bindings leilao_<id> no RabbitMQ
+filas_sse = {}      # cliente -> FilaSSE
+remocoes = {}       # cliente desconectado -> TimerHandle da remoção dos interesses
+
+
+# ----- Utilitários -----
+def enviar_evento_cliente(client, frame, chave=None):
+    fila = filas_sse.get(client)
+    if fila and not fila.lento and not fila.colocar(frame, chave):
+        logging.warning(f"Cliente {client} lento demais, desconectando: {fila.metricas()}")
+
+
+def broadcast_interessados(leilao, evento, data):
+    _, frame = historico.registrar(leilao, evento, data)
+    lista = interesses.assinantes(leilao)
+    if not lista:
+        logging.warning(f"BROADCAST -> Nenhum cliente interessado para o leilão {leilao}.")
+        return
+    chave = chave_conflacao(evento, leilao)
+    for cliente in lista:
+        fila = filas_sse.get(cliente)
+        if fila is None or not fila.aguarda_reenvio(leilao):     # senão vai no reenvio
+            enviar_evento_cliente(cliente, frame, chave)
+
+
+def distribuir(evento, payload):
+    # roda no event loop, agendado pela thread do RabbitMQ
+    if 'leilao' in payload:
+        leilao = str(payload['leilao'])
+        if evento == 'lance_invalidado':
+            broadcast_interessados(leilao, 'lance_invalido', payload)
+        else:
+            broadcast_interessados(leilao, evento, payload)
+    else:
+        _, frame = historico.registrar(None, evento, payload)
+        for cid in list(filas_sse.keys()):
+            enviar_evento_cliente(cid, frame)
+
+
+@web.middleware
+async def cors(request, handler):
+    if request.method == "OPTIONS":
+        resp = web.Response()
+        resp.headers["Access-Control-Allow-Methods"] = "GET, POST, DELETE, OPTIONS"
+        resp.headers["Access-Control-Allow-Headers"] = request.headers.get("Access-Control-Request-Headers", "*")
+    else:
+        resp = await handler(request)
+        if resp.prepared:
+            # stream SSE: os headers já foram enviados no prepare()
+            return resp
+    resp.headers["Access-Control-Allow-Origin"] = "*"
+    resp.headers["Access-Control-Expose-Headers"] = "X-Proximo-Cursor, X-Revisao"
+    return resp
+
+
+async def proxy(request, url, payload=None):
+    headers = {}
+    if "If-None-Match" in request.headers:
+        headers["If-None-Match"] = request.headers["If-None-Match"]
+    try:
+        async with request.app["sessao"].request(request.method, url, params=request.query,
+                                                 json=payload, headers=headers) as resp:
+            corpo = await resp.read()
+            return web.Response(body=corpo, status=resp.status,
+                                headers={h: resp.headers[h] for h in HEADERS_REPASSADOS if h in resp.headers})
+    except (ClientConnectorError, asyncio.TimeoutError) as e:
+        logging.warning(f"Backend {url} indisponível: {e}")
+        return web.json_response({"error": "backend indisponivel"}, status=503)
+    except (ClientError, OSError) as e:
+        # backend caiu no meio da resposta (ServerDisconnectedError, ClientPayloadError...)
+        logging.warning(f"Resposta inválida do backend {url}: {e}")
+        return web.json_response({"error": "resposta invalida do backend"}, status=502)
+
+
+async def ler_json(request, obrigatorios=()):
+    try:
+        data = await request.json()
+    except (ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(data, dict) or any(k not in data for k in obrigatorios):
+        return None
+    return data
+
+
+# ----- Endpoints -----
+async def criar_leilao(request):
+    payload = await ler_json(request)
+    if not payload:
+        return web.json_response({"error": "JSON body required"}, status=400)
+    return await proxy(request, f"{MS_LEILAO_URL}/leiloes", payload)
+
+
+async def listar_leiloes(request):
+    return await proxy(request, f"{MS_LEILAO_URL}/leiloes")
+
+
+async def delta_leiloes(request):
+    return await proxy(request, f"{MS_LEILAO_URL}/leiloes/delta")
+
+
+async def efetuar_lance(request):
+    payload = await ler_json(request)
+    if not payload:
+        return web.json_response({"error": "JSON body required"}, status=400)
+    url = MS_LANCE_URLS[shard_do_leilao(payload.get("leilao"), N_SHARDS_LANCE)]
+    return await proxy(request, f"{url}/lances", payload)
+
+
+async def registrar_interesse(request):
+    data = await ler_json(request, ("cliente", "leilao"))
+    if data is None:
+        return web.json_response({"error": "cliente and leilao required"}, status=400)
+    interesses.registrar(data["cliente"], data["leilao"])
+    # o bind é feito na thread do RabbitMQ; espera fora do loop
+    if not await asyncio.get_running_loop().run_in_executor(None, vinculos.esperar, data["leilao"]):
+        logging.warning(f"Sem bind para o leilão {data['leilao']}: eventos publicados agora podem não chegar a {data['cliente']}")
+    fila = filas_sse.get(data["cliente"])
+    if fila is not None:
+        # cliente reconectou com Last-Event-ID: reenvia o que perdeu desse
+        # leilão, incluindo o que chegou durante o bind (não foi ao vivo)
+        reenviar(historico, fila, [data["leilao"]])
+    logging.info("Cliente %s registrado para leilao %s", data["cliente"], data["leilao"])
+    return web.json_response({"ok": True})
+
+
+async def cancelar_interesse(request):
+    data = await ler_json(request, ("cliente", "leilao"))
+    if data is None:
+        return web.json_response({"error": "cliente and leilao required"}, status=400)
+    interesses.cancelar(data["cliente"], data["leilao"])
+    logging.info(f"Cliente {data['cliente']} não possui mais interesse no leilao {data['leilao']}")
+    return web.json_response({"ok": True})
+
+
+async def metricas_sse(request):
+    return web.json_response({cliente: fila.metricas() for cliente, fila in filas_sse.items()})
+
+
+async def sse_stream(request):
+    cliente = request.match_info["cliente"]
+    sinal = asyncio.Event()
+    fila = FilaSSE(max_pendentes=MAX_PENDENTES_SSE, max_atraso=MAX_ATRASO_SSE, ao_colocar=sinal.set)
+    valor = request.headers.get("Last-Event-ID") or request.query.get("last_event_id")
+    fila.retomar_de = int(valor) if valor and valor.isdigit() else None
+    filas_sse[cliente] = fila
+    if cliente in remocoes:
+        remocoes.pop(cliente).cancel()
+    reenviar(historico, fila, interesses.leiloes_do_cliente(cliente) | {None})
+    logging.info(f"Cliente SSE conectado: {cliente} (Fila registrada, retomando de {fila.retomar_de})")
+
+    resp = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache",
+                                       "Access-Control-Allow-Origin": "*"})
+    await resp.prepare(request)
+    try:
+        await resp.write(montar_frame("connected", {"msg": "connected", "cliente": cliente}))
+        while True:
+            try:
+                await asyncio.wait_for(sinal.wait(), KEEPALIVE_SSE)
+            except asyncio.TimeoutError:
+                await resp.write(b"\n")
+                continue
+            sinal.clear()
+            frames = fila.retirar_nowait()
+            if fila.lento:
+                logging.warning(f"Encerrando stream SSE do cliente lento {cliente}")
+                break
+            if frames is not None:
+                await resp.write(frames)
+            if len(fila):
+                # sobrou mais que uma escrita: continua sem esperar novo evento
+                sinal.set()
+    except ConnectionResetError:
+        logging.info(f"Cliente SSE desconectado: {cliente}")
+    finally:
+        if filas_sse.get(cliente) is fila:
+            del filas_sse[cliente]
+            # como no API_gateway.py: interesses e bindings ficam por TEMPO_GRACA
+            # segundos, para a reconexão do EventSource retomar pelo histórico
+            remocoes[cliente] = asyncio.get_running_loop().call_later(
+                TEMPO_GRACA, remover_desconectado, cliente)
+    return resp
+
+
+def remover_desconectado(cliente):
+    del remocoes[cliente]
+    interesses.remover_cliente(cliente)
+    logging.info(f"Interesses do cliente SSE {cliente} removidos após {TEMPO_GRACA}s desconectado")
+
+
+# ----- MOM (RabbitMQ) -----
+def comunicacao_interna(loop):
+    logging.info("Iniciando RabbitMQ...")
+    params = pika.ConnectionParameters(host=RABBITMQ_HOST)
+    conn = pika.BlockingConnection(params)
+    ch = conn.channel()
+    ch.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
+
+    result = ch.queue_declare(queue='', exclusive=True)
+    fila = result.method.queue
+
+    # mesmos bindings do API_gateway.py: leilao_<id> sob demanda + status_pagamento
+    ch.queue_bind(exchange=EXCHANGE_NAME, queue=fila, routing_key='status_pagamento')
+    vinculos.iniciar(conn, ch, fila)
+
+    def callback(ch, method, properties, body):
+        try:
+            payload = decodificar(body, properties.content_type)
+            loop.call_soon_threadsafe(distribuir, properties.type or method.routing_key, payload)
+        except Exception as e:
+            logging.exception(f"Erro ao processar evento RabbitMQ: {e}")
+
+    consumidor = Consumidor(conn, ch)
+    consumidor.consumir(fila, callback)
+    try:
+        consumidor.rodar()
+    except Exception as e:
+        logging.exception(f"RabbitMQ finalizado com erro: {e}")
+    finally:
+        try:
+            conn.close()
+        except Exception:
+            pass
+        logging.info("RabbitMQ encerrado.")
+
+
+# ----- Main -----
+async def iniciar(app):
+    app["sessao"] = ClientSession(connector=TCPConnector(limit_per_host=MAX_CONEXOES_BACKEND),
+                                  timeout=TIMEOUT_BACKEND)
+    loop = asyncio.get_running_loop()
+    threading.Thread(target=comunicacao_interna, args=(loop,), daemon=True).start()
+
+
+async def encerrar(app):
+    await app["sessao"].close()
+
+
+def criar_app():
+    app = web.Application(middlewares=[cors])
+    app.router.add_post("/leiloes", criar_leilao)
+    app.router.add_get("/leiloes", listar_leiloes)
+    app.router.add_get("/leiloes/delta", delta_leiloes)
+    app.router.add_post("/lances", efetuar_lance)
+    app.router.add_post("/interesse", registrar_interesse)
+    app.router.add_delete("/interesse", cancelar_interesse)
+    app.router.add_get("/sse/metricas", metricas_sse)
+    app.router.add_get("/sse/{cliente}", sse_stream)
+    app.on_startup.append(iniciar)
+    app.on_cleanup.append(encerrar)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(criar_app(), host="0.0.0.0", port=PORT)
@@ -0,0 +1,54 @@
+import heapq
+import itertools
+import threading
+import time
+import logging
+
+
+class Agendador:
+    # Agendador orientado a eventos: min-heap de (instante, seq, evento), com os
+    # instantes já convertidos para epoch. A thread dorme até o próximo prazo e é
+    # acordada antes se um evento mais cedo for inserido.
+    def __init__(self, ao_disparar):
+        self._heap = []
+        self._cond = threading.Condition()
+        self._seq = itertools.count()       # desempate estável para instantes iguais
+        self._ao_disparar = ao_disparar
+
+    def agendar(self, instante, evento):
+        with self._cond:
+            seq = next(self._seq)
+            heapq.heappush(self._heap, (instante, seq, evento))
+            # só precisa acordar a thread se o novo evento virou o próximo prazo
+            if self._heap[0][1] == seq:
+                self._cond.notify()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._heap)
+
+    def _proximos_vencidos(self):
+        with self._cond:
+            while True:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                espera = self._heap[0][0] - time.time()
+                if espera <= 0:
+                    break
+                self._cond.wait(espera)
+            agora = time.time()
+            vencidos = []
+            while self._heap and self._heap[0][0] <= agora:
+                instante, _, evento = heapq.heappop(self._heap)
+                vencidos.append((instante, evento))
+            return vencidos
+
+    def rodar(self):
+        while True:
+            # os callbacks rodam fora do lock, então agendar() nunca espera por eles
+            for instante, evento in self._proximos_vencidos():
+                try:
+                    self._ao_disparar(instante, evento)
+                except Exception as e:
+                    logging.exception(f"Erro ao disparar evento agendado {evento}: {e}")
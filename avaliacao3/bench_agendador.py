@@ -0,0 +1,44 @@
+import sys
+import time
+import random
+import threading
+from agendador import Agendador
+
+# Mede o atraso (jitter) de disparo do Agendador com muitos leilões programados.
+# Cada leilão agenda início e fim espalhados numa janela de alguns segundos.
+# Uso: python bench_agendador.py [leiloes] [janela_s]
+atrasos = []
+terminou = threading.Event()
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    janela = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    total = 2 * n
+
+    def ao_disparar(instante, evento):
+        atrasos.append(time.time() - instante)
+        if len(atrasos) == total:
+            terminou.set()
+
+    agendador = Agendador(ao_disparar)
+    threading.Thread(target=agendador.rodar, daemon=True).start()
+
+    base = time.time() + 2.0
+    inicio_insercao = time.perf_counter()
+    for i in range(n):
+        inicio = base + random.random() * janela
+        agendador.agendar(inicio, ("leilao_iniciado", i))
+        agendador.agendar(inicio + random.random() * janela, ("leilao_finalizado", i))
+    insercao = time.perf_counter() - inicio_insercao
+
+    terminou.wait()
+    atrasos.sort()
+    ms = lambda x: x * 1000
+    print(f"{n} leilões ({total} eventos), inserção em {insercao:.2f}s ({total / insercao:.0f} eventos/s)")
+    print(f"atraso p50={ms(atrasos[len(atrasos) // 2]):.2f}ms  "
+          f"p99={ms(atrasos[int(len(atrasos) * 0.99)]):.2f}ms  max={ms(atrasos[-1]):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import sys
+import time
+import pika
+from publicador import Publicador, RABBITMQ_HOST, EXCHANGE_NAME
+from consumidor import Consumidor
+
+# Vazão de consumo com RabbitMQ local: enche uma fila com N mensagens e mede
+# quanto tempo leva para consumir tudo com ack por mensagem e sem prefetch
+# (como os consumidores faziam) e com o Consumidor em várias combinações de
+# prefetch / lote de ack.
+# Uso: python bench_consumidor.py [mensagens]
+ROTA = "bench_consumidor"
+CONFIGURACOES = [(0, 1), (1, 1), (32, 16), (256, 64), (1024, 256)]     # (prefetch, lote_ack); 0 = sem limite
+
+
+def encher(n):
+    publicador = Publicador(tamanho_pool=1)
+    corpo = b'{"cliente": "C1", "leilao": "L1", "valor": 123.45, "venceu": false}'
+    for _ in range(n):
+        publicador.publicar_bytes(ROTA, corpo)
+    publicador.fechar()
+
+
+def por_mensagem(conn, ch, fila, n):
+    # caminho antigo: basic_ack a cada mensagem, sem basic_qos
+    recebidas = [0]
+
+    def callback(ch, method, properties, body):
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+        recebidas[0] += 1
+        if recebidas[0] == n:
+            ch.stop_consuming()
+    ch.basic_consume(queue=fila, on_message_callback=callback)
+    ch.start_consuming()
+
+
+def em_lote(conn, ch, fila, n, prefetch, lote_ack):
+    consumidor = Consumidor(conn, ch, prefetch=prefetch, lote_ack=lote_ack)
+    consumidor.consumir(fila, lambda ch, method, properties, body: None)
+    consumidor.rodar(parar=lambda: consumidor.mensagens >= n)
+    return consumidor.acks
+
+
+def medir(nome, n, funcao, *args):
+    conn = pika.BlockingConnection(pika.ConnectionParameters(host=RABBITMQ_HOST))
+    ch = conn.channel()
+    ch.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
+    fila = ch.queue_declare(queue="", exclusive=True).method.queue
+    ch.queue_bind(exchange=EXCHANGE_NAME, queue=fila, routing_key=ROTA)
+    encher(n)
+    inicio = time.perf_counter()
+    acks = funcao(conn, ch, fila, n, *args)
+    total = time.perf_counter() - inicio
+    conn.close()
+    print(f"{nome:<28} {n / total:9.0f} msgs/s  ({acks if acks is not None else n} acks)")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    medir("ack por mensagem", n, por_mensagem)
+    for prefetch, lote_ack in CONFIGURACOES:
+        medir(f"prefetch={prefetch} lote={lote_ack}", n, em_lote, prefetch, lote_ack)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import sys
+import json
+import time
+import queue
+from eventos_sse import montar_frame, chave_conflacao, FilaSSE
+
+# Eventos/s no fan-out SSE com muitos assinantes no mesmo leilão:
+# "por assinante" repete o caminho antigo (dict na fila, json.dumps e duas
+# escritas por assinante); "frame único" serializa uma vez e cada assinante
+# faz uma escrita com os frames pendentes; "conflação" usa a FilaSSE, que
+# mantém só o lance mais recente por leilão.
+# Uso: python bench_fanout.py [assinantes] [eventos]
+PAYLOAD = {"cliente": "C1", "leilao": "L1", "valor": 123.45, "venceu": False, "descricao": "Guitarra elétrica"}
+
+
+def por_assinante(filas, eventos):
+    escritas = 0
+    for v in range(eventos):
+        for fila in filas:
+            fila.put_nowait({"event": "lance_validado", "data": dict(PAYLOAD, valor=v)})
+    for fila in filas:
+        while not fila.empty():
+            item = fila.get_nowait()
+            chunks = [f"event: {item['event']}\n".encode("utf-8"),
+                      f"data: {json.dumps(item['data'], ensure_ascii=False)}\n\n".encode("utf-8")]
+            escritas += len(chunks)
+    return escritas
+
+
+def frame_unico(filas, eventos):
+    for v in range(eventos):
+        frame = montar_frame("lance_validado", dict(PAYLOAD, valor=v))
+        for fila in filas:
+            fila.colocar(frame)
+    return esvaziar(filas)
+
+
+def conflacao(filas, eventos):
+    chave = chave_conflacao("lance_validado", PAYLOAD["leilao"])
+    for v in range(eventos):
+        frame = montar_frame("lance_validado", dict(PAYLOAD, valor=v))
+        for fila in filas:
+            fila.colocar(frame, chave)
+    return esvaziar(filas)
+
+
+def esvaziar(filas):
+    escritas = 0
+    for fila in filas:
+        while fila.retirar_nowait() is not None:
+            escritas += 1
+    return escritas
+
+
+def medir(nome, funcao, assinantes, eventos):
+    if funcao is por_assinante:
+        filas = [queue.Queue(maxsize=eventos) for _ in range(assinantes)]
+    else:
+        filas = [FilaSSE(max_pendentes=eventos) for _ in range(assinantes)]
+    inicio = time.perf_counter()
+    escritas = funcao(filas, eventos)
+    total = time.perf_counter() - inicio
+    print(f"{nome:<15} {eventos / total:9.0f} eventos/s  ({eventos * assinantes / total:10.0f} entregas/s, {escritas} escritas)")
+
+
+def main():
+    assinantes = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    eventos = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    medir("por assinante", por_assinante, assinantes, eventos)
+    medir("frame único", frame_unico, assinantes, eventos)
+    medir("conflação", conflacao, assinantes, eventos)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import sys
+import json
+import time
+import logging
+import threading
+import requests
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import API_gateway
+
+# Latência do gateway (p50/p99) contra backends stub locais, com o cliente
+# de backend em pool/keep-alive e com uma conexão nova por requisição
+# (comportamento antigo, usando o módulo requests direto).
+# Uso: python bench_gateway.py [requisicoes_por_thread] [threads] [latencia_stub_ms]
+GATEWAY_PORT = 5000
+
+
+class StubBackend(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive
+    latencia = 0.0
+
+    def _responder(self, corpo):
+        time.sleep(self.latencia)
+        dados = json.dumps(corpo).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        self._responder([])
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._responder({"ok": True})
+
+    def log_message(self, *args):
+        pass
+
+
+def subir_stub(url):
+    porta = int(url.rsplit(":", 1)[1])
+    servidor = ThreadingHTTPServer(("localhost", porta), StubBackend)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+
+def medir(nome, por_thread, threads):
+    latencias = []
+    lock = threading.Lock()
+
+    def worker(i):
+        sessao = requests.Session()
+        minhas = []
+        for v in range(por_thread):
+            inicio = time.perf_counter()
+            sessao.post(f"http://localhost:{GATEWAY_PORT}/lances", json={"cliente": f"C{i}", "leilao": "L1", "valor": v})
+            minhas.append(time.perf_counter() - inicio)
+        with lock:
+            latencias.extend(minhas)
+
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    inicio = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    total = time.perf_counter() - inicio
+    latencias.sort()
+    ms = lambda x: x * 1000
+    print(f"{nome:<22} {len(latencias) / total:8.0f} req/s  p50={ms(latencias[len(latencias) // 2]):6.2f}ms  "
+          f"p99={ms(latencias[int(len(latencias) * 0.99)]):6.2f}ms")
+
+
+def main():
+    por_thread = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    StubBackend.latencia = (float(sys.argv[3]) if len(sys.argv) > 3 else 1.0) / 1000
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    subir_stub(API_gateway.MS_LEILAO_URL)
+    subir_stub(API_gateway.backends_lance[0].url_base)
+    threading.Thread(target=API_gateway.app.run,
+                     kwargs={"port": GATEWAY_PORT, "threaded": True}, daemon=True).start()
+    time.sleep(1)
+
+    medir("pool keep-alive", por_thread, threads)
+    # sessao.request(...) passa a ser requests.request(...): conexão nova a cada chamada
+    API_gateway.backends_lance[0].sessao = requests
+    medir("conexão por requisição", por_thread, threads)
+
+
+if __name__ == "__main__":
+    main()
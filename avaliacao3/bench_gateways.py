@@ -0,0 +1,128 @@
+import sys
+import json
+import time
+import asyncio
+import resource
+import subprocess
+import multiprocessing
+from publicador import Publicador, rota_leilao
+
+# Escala horizontal do gateway: sobe K processos do API_gateway_async.py (portas
+# 6000..6000+K-1, RabbitMQ local), distribui os leilões entre eles (todos os
+# clientes de um leilão na mesma instância) e abre um processo de carga SSE por
+# instância. Os eventos são publicados em leilao_<id>, então cada instância só
+# recebe os eventos dos seus leilões. Mede entregas/s e latência para cada K.
+# Uso: python bench_gateways.py [assinantes] [leiloes] [eventos] [instancias...]
+HOST = "localhost"
+PORTA_BASE = 6000
+EVENTO = "bench"        # evento não conflacionável: toda publicação é entregue
+
+
+async def http(porta, metodo, caminho, corpo):
+    reader, writer = await asyncio.open_connection(HOST, porta)
+    dados = json.dumps(corpo).encode("utf-8")
+    writer.write(f"{metodo} {caminho} HTTP/1.1\r\nHost: {HOST}\r\nConnection: close\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(dados)}\r\n\r\n".encode() + dados)
+    await writer.drain()
+    await reader.read()
+    writer.close()
+
+
+async def assinante(porta, cliente, conectado, latencias):
+    reader, writer = await asyncio.open_connection(HOST, porta)
+    writer.write(f"GET /sse/{cliente} HTTP/1.1\r\nHost: {HOST}\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    while True:
+        linha = await reader.readline()
+        if not linha:
+            return
+        if linha.startswith(b"event: connected"):
+            conectado.set()
+        elif linha.startswith(b"data: ") and b'"t"' in linha:
+            latencias.append(time.time() - json.loads(linha[6:])["t"])
+
+
+async def carga_async(porta, clientes, esperados, pronto, resultados):
+    latencias = []
+    tasks = []
+    for cliente, leilao in clientes:
+        conectado = asyncio.Event()
+        tasks.append(asyncio.create_task(assinante(porta, cliente, conectado, latencias)))
+        await conectado.wait()
+        await http(porta, "POST", "/interesse", {"cliente": cliente, "leilao": leilao})
+    pronto.put(porta)
+    limite = time.monotonic() + 60
+    while len(latencias) < esperados and time.monotonic() < limite:
+        await asyncio.sleep(0.05)
+    resultados.put((porta, time.time(), latencias))
+    for t in tasks:
+        t.cancel()
+
+
+def carga(porta, clientes, esperados, pronto, resultados):
+    _, maximo = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (maximo, maximo))
+    asyncio.run(carga_async(porta, clientes, esperados, pronto, resultados))
+
+
+def rodar(instancias, assinantes, leiloes, eventos):
+    gateways = [subprocess.Popen([sys.executable, "API_gateway_async.py", str(PORTA_BASE + i)],
+                                 stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                for i in range(instancias)]
+    time.sleep(2)
+    try:
+        # leilão j vai para a instância j % K; cliente i assiste o leilão i % leiloes
+        por_instancia = [[] for _ in range(instancias)]
+        for i in range(assinantes):
+            leilao = i % leiloes
+            por_instancia[leilao % instancias].append((f"bench{i}", f"bench_gw_{leilao}"))
+        pronto = multiprocessing.Queue()
+        resultados = multiprocessing.Queue()
+        processos = [multiprocessing.Process(target=carga, args=(PORTA_BASE + i, clientes, len(clientes) * eventos,
+                                                                   pronto, resultados))
+                     for i, clientes in enumerate(por_instancia)]
+        for p in processos:
+            p.start()
+        for _ in processos:
+            pronto.get()
+
+        publicador = Publicador()
+        inicio = time.time()
+        for v in range(eventos):
+            for j in range(leiloes):
+                publicador.publicar(rota_leilao(f"bench_gw_{j}"),
+                                    {"leilao": f"bench_gw_{j}", "valor": v, "t": time.time()}, EVENTO)
+        publicado = time.time() - inicio
+        publicador.fechar()
+
+        fim = inicio
+        latencias = []
+        for _ in processos:
+            _, terminou, parciais = resultados.get()
+            fim = max(fim, terminou)
+            latencias.extend(parciais)
+        for p in processos:
+            p.join()
+    finally:
+        for g in gateways:
+            g.terminate()
+            g.wait()
+
+    latencias.sort()
+    ms = lambda x: x * 1000
+    total = fim - inicio
+    print(f"K={instancias}: {len(latencias)}/{assinantes * eventos} entregas em {total:.1f}s "
+          f"({len(latencias) / total:8.0f} entregas/s, publicação {publicado:.1f}s)  "
+          f"p50={ms(latencias[len(latencias) // 2]):.1f}ms  p99={ms(latencias[int(len(latencias) * 0.99)]):.1f}ms")
+
+
+def main():
+    assinantes = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    leiloes = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    eventos = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+    for instancias in [int(k) for k in sys.argv[4:]] or [1, 2, 4]:
+        rodar(instancias, assinantes, leiloes, eventos)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import sys
+import time
+import threading
+import requests
+from publicador import Publicador
+from particoes import rota_do_leilao
+
+# Teste de carga do POST /lances do ms_lance com threads concorrentes.
+# Cada thread dá lances crescentes em um leilão próprio ("distintos") ou todas
+# no mesmo leilão ("mesmo"), para comparar o ganho do lock por leilão.
+# Uso: python bench_lances.py [lances_por_thread]   (ms_lance e RabbitMQ rodando)
+MS_LANCE_URL = "http://localhost:5002"
+RABBITMQ_HOST = "localhost"
+EXCHANGE_NAME = "leilao_control"
+THREADS = [1, 2, 4, 8, 16]
+
+
+def abrir_leiloes(publicador, ids):
+    for lid in ids:
+        publicador.publicar(rota_do_leilao(lid), {"leilao": lid}, "leilao_iniciado")
+    time.sleep(1)
+
+
+def fechar_leiloes(publicador, ids):
+    for lid in ids:
+        publicador.publicar(rota_do_leilao(lid), {"leilao": lid}, "leilao_finalizado")
+
+
+def rodada(modo, n_threads, lances, publicador):
+    prefixo = f"bench_{modo}_{n_threads}_{int(time.time())}"
+    if modo == "mesmo":
+        ids = [prefixo] * n_threads
+    else:
+        ids = [f"{prefixo}_{i}" for i in range(n_threads)]
+    abrir_leiloes(publicador, set(ids))
+
+    def worker(i):
+        sessao = requests.Session()
+        for v in range(lances):
+            # valores intercalados entre threads para que o mesmo leilão aceite todos
+            valor = v * n_threads + i + 1
+            sessao.post(f"{MS_LANCE_URL}/lances", json={"cliente": f"C{i}", "leilao": ids[i], "valor": valor})
+
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    inicio = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    total = time.perf_counter() - inicio
+    fechar_leiloes(publicador, set(ids))
+    print(f"{modo:<9} threads={n_threads:<3} {lances * n_threads:>7} lances  {total:7.2f}s  {lances * n_threads / total:9.0f} lances/s")
+
+
+def main():
+    lances = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    publicador = Publicador(host=RABBITMQ_HOST, exchange=EXCHANGE_NAME)
+    for modo in ["distintos", "mesmo"]:
+        for n in THREADS:
+            rodada(modo, n, lances, publicador)
+    publicador.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+import sys
+import timeit
+from mensagens import codificar, decodificar, CONTENT_TYPE_JSON, CONTENT_TYPE_BINARIO
+
+# Custo de codificar/decodificar e bytes por mensagem de cada evento interno,
+# em JSON (como era) e no formato binário do mensagens.py.
+# Uso: python bench_mensagens.py [repeticoes]
+EVENTOS = {
+    "lance_validado": {"cliente": "C1", "leilao": "L42", "valor": 1234.5, "venceu": False},
+    "leilao_iniciado": {"leilao": "42", "descricao": "Guitarra elétrica assinada por Jimi Hendrix",
+                        "inicio": "2025-01-10 12:00:00", "fim": "2025-01-10 12:30:00", "status": "ativo"},
+    "link_pagamento": {"transaction_id": "6f1c9a0e-8d1b-4a57-9f55-0c2d6f1e7b3a",
+                       "link": "http://mock-payments.local/pay/6f1c9a0e-8d1b-4a57-9f55-0c2d6f1e7b3a",
+                       "leilao": "42", "vencedor": "C1", "valor": 1234.5},
+    "status_pagamento": {"transaction_id": "6f1c9a0e-8d1b-4a57-9f55-0c2d6f1e7b3a", "status": "aprovado", "info": None},
+}
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"{'evento':<18} {'formato':<8} {'bytes':>6} {'codificar':>12} {'decodificar':>12}")
+    for evento, payload in EVENTOS.items():
+        for nome, formato in [("json", CONTENT_TYPE_JSON), ("binário", CONTENT_TYPE_BINARIO)]:
+            content_type, corpo = codificar(payload, formato)
+            assert content_type == formato and decodificar(corpo, content_type) == payload
+            cod = timeit.timeit(lambda: codificar(payload, formato), number=n) / n
+            dec = timeit.timeit(lambda: decodificar(corpo, content_type), number=n) / n
+            print(f"{evento:<18} {nome:<8} {len(corpo):>6} {cod * 1e6:>10.2f}us {dec * 1e6:>10.2f}us")
+
+
+if __name__ == "__main__":
+    main()
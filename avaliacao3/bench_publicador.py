@@ -0,0 +1,58 @@
+import sys
+import json
+import time
+import threading
+import pika
+from publicador import Publicador
+
+# Microbenchmark: publicações/s abrindo uma conexão por mensagem (modo antigo)
+# contra o Publicador com pool de conexões persistentes.
+# Uso: python bench_publicador.py [mensagens] [threads]   (precisa do RabbitMQ local)
+EXCHANGE_NAME = "leilao_bench"
+RABBITMQ_HOST = "localhost"
+PAYLOAD = {"cliente": "C1", "leilao": "L1", "valor": 100.0}
+
+
+def publicar_antigo(routing_key, payload):
+    conn = pika.BlockingConnection(pika.ConnectionParameters(host=RABBITMQ_HOST))
+    ch = conn.channel()
+    ch.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
+    ch.basic_publish(exchange=EXCHANGE_NAME, routing_key=routing_key,
+                     body=json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+    conn.close()
+
+
+def medir(nome, publicar, mensagens, threads):
+    por_thread = mensagens // threads
+
+    def worker():
+        for _ in range(por_thread):
+            publicar("bench", PAYLOAD)
+
+    ts = [threading.Thread(target=worker) for _ in range(threads)]
+    inicio = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    total = time.perf_counter() - inicio
+    print(f"{nome:<28} {por_thread * threads:>7} msgs  {total:7.2f}s  {por_thread * threads / total:10.0f} msgs/s")
+
+
+def main():
+    mensagens = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    medir("conexão por mensagem", publicar_antigo, mensagens, threads)
+
+    pub = Publicador(host=RABBITMQ_HOST, exchange=EXCHANGE_NAME, tamanho_pool=threads)
+    medir("pool persistente", pub.publicar, mensagens, threads)
+    pub.fechar()
+
+    pub = Publicador(host=RABBITMQ_HOST, exchange=EXCHANGE_NAME, tamanho_pool=threads, confirmar=True)
+    medir("pool persistente + confirms", pub.publicar, mensagens, threads)
+    pub.fechar()
+
+
+if __name__ == "__main__":
+    main()
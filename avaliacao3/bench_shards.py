@@ -0,0 +1,81 @@
+import os
+import sys
+import time
+import threading
+import subprocess
+import multiprocessing
+import requests
+from publicador import Publicador
+from particoes import shard_do_leilao, porta_shard, rota_do_leilao
+
+# Vazão do ms_lance particionado: sobe N processos "python ms_lance.py i N",
+# abre leilões pelo RabbitMQ (cada um chega só ao shard dono) e dispara lances
+# de vários processos de carga, cada lance direto no shard do leilão (como o
+# gateway faz). Compara lances/s para cada N numa máquina com vários núcleos.
+# Uso: python bench_shards.py [lances_por_thread] [shards...]   (RabbitMQ rodando)
+PROCESSOS_CARGA = max(2, (os.cpu_count() or 2) // 2)
+THREADS_POR_PROCESSO = 8
+LEILOES = 256
+
+
+def carga(n_shards, ids, lances, resultados):
+    def worker(i):
+        sessao = requests.Session()
+        urls = {}
+        for v in range(lances):
+            leilao = ids[(i + v) % len(ids)]
+            if leilao not in urls:
+                urls[leilao] = f"http://localhost:{porta_shard(shard_do_leilao(leilao, n_shards), n_shards)}/lances"
+            # valores crescentes no tempo: quase todos os lances são aceitos
+            sessao.post(urls[leilao], json={"cliente": f"C{i}", "leilao": leilao, "valor": time.time()})
+
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS_POR_PROCESSO)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    resultados.put(lances * THREADS_POR_PROCESSO)
+
+
+def rodada(n_shards, lances):
+    shards = [subprocess.Popen([sys.executable, "ms_lance.py", str(i), str(n_shards)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+              for i in range(n_shards)]
+    try:
+        time.sleep(2)
+        ids = [f"bench_shard_{n_shards}_{int(time.time())}_{i}" for i in range(LEILOES)]
+        publicador = Publicador()
+        for lid in ids:
+            publicador.publicar(rota_do_leilao(lid), {"leilao": lid}, "leilao_iniciado")
+        time.sleep(1)
+
+        resultados = multiprocessing.Queue()
+        # cada processo de carga fica com uma fatia dos leilões
+        processos = [multiprocessing.Process(target=carga, args=(n_shards, ids[p::PROCESSOS_CARGA], lances, resultados))
+                     for p in range(PROCESSOS_CARGA)]
+        inicio = time.perf_counter()
+        for p in processos:
+            p.start()
+        total_lances = sum(resultados.get() for _ in processos)
+        total = time.perf_counter() - inicio
+        for p in processos:
+            p.join()
+
+        for lid in ids:
+            publicador.publicar(rota_do_leilao(lid), {"leilao": lid}, "leilao_finalizado")
+        publicador.fechar()
+    finally:
+        for s in shards:
+            s.terminate()
+            s.wait()
+    print(f"shards={n_shards:<2} {total_lances:>7} lances  {total:7.2f}s  {total_lances / total:9.0f} lances/s")
+
+
+def main():
+    lances = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    for n in [int(n) for n in sys.argv[2:]] or [1, 2, 4]:
+        rodada(n, lances)
+
+
+if __name__ == "__main__":
+    main()
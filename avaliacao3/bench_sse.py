@@ -0,0 +1,91 @@
+import sys
+import json
+import time
+import asyncio
+import resource
+from publicador import Publicador, rota_leilao
+
+# Mantém N conexões SSE abertas no gateway (rode API_gateway_async.py ou
+# API_gateway.py na porta 5000, com RabbitMQ local), registra todas no mesmo
+# leilão e publica eventos lance_validado, medindo a latência de entrega a
+# todos os assinantes.
+# Uso: python bench_sse.py [conexoes] [eventos]
+HOST = "localhost"
+PORT = 5000
+LEILAO = "bench_sse"
+latencias = []
+
+
+async def http(metodo, caminho, corpo=None):
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    dados = json.dumps(corpo).encode("utf-8") if corpo is not None else b""
+    writer.write(f"{metodo} {caminho} HTTP/1.1\r\nHost: {HOST}\r\nConnection: close\r\n"
+                 f"Content-Type: application/json\r\nContent-Length: {len(dados)}\r\n\r\n".encode() + dados)
+    await writer.drain()
+    await reader.read()
+    writer.close()
+
+
+async def assinante(i, conectados, recebidos):
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    writer.write(f"GET /sse/bench{i} HTTP/1.1\r\nHost: {HOST}\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    while True:
+        linha = await reader.readline()
+        if not linha:
+            return
+        if linha.startswith(b"event: connected"):
+            conectados.release()
+        elif linha.startswith(b"data: ") and b'"t"' in linha:
+            payload = json.loads(linha[6:])
+            latencias.append(time.time() - payload["t"])
+            recebidos.release()
+
+
+async def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    eventos = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    _, maximo = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (maximo, maximo))
+
+    conectados = asyncio.Semaphore(0)
+    recebidos = asyncio.Semaphore(0)
+    inicio = time.perf_counter()
+    tasks = []
+    for i in range(n):
+        tasks.append(asyncio.create_task(assinante(i, conectados, recebidos)))
+        if i % 500 == 499:
+            await asyncio.sleep(0.05)
+    for _ in range(n):
+        await conectados.acquire()
+    print(f"{n} conexões SSE abertas em {time.perf_counter() - inicio:.1f}s")
+
+    limite = asyncio.Semaphore(200)
+
+    async def registrar(i):
+        async with limite:
+            await http("POST", "/interesse", {"cliente": f"bench{i}", "leilao": LEILAO})
+    await asyncio.gather(*(registrar(i) for i in range(n)))
+
+    publicador = Publicador()
+    inicio = time.perf_counter()
+    for v in range(eventos):
+        await asyncio.to_thread(publicador.publicar, rota_leilao(LEILAO),
+                                {"leilao": LEILAO, "cliente": "bench", "valor": v, "t": time.time()},
+                                "lance_validado")
+        await asyncio.sleep(0.2)
+    for _ in range(n * eventos):
+        await recebidos.acquire()
+    total = time.perf_counter() - inicio
+    publicador.fechar()
+
+    latencias.sort()
+    ms = lambda x: x * 1000
+    print(f"{len(latencias)} entregas em {total:.1f}s  p50={ms(latencias[len(latencias) // 2]):.1f}ms  "
+          f"p99={ms(latencias[int(len(latencias) * 0.99)]):.1f}ms  max={ms(latencias[-1]):.1f}ms")
+    for t in tasks:
+        t.cancel()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
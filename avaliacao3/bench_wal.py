@@ -0,0 +1,64 @@
+import sys
+import time
+import shutil
+import tempfile
+import threading
+from log_lances import LogLances
+
+# Log de lances do ms_lance:
+#  - vazão de anexar+esperar com uma thread (um fsync por lance) e com várias
+#    threads concorrentes (group commit: um fsync cobre o lote acumulado)
+#  - tempo de recuperação de N lances só pelo log e depois de compactado em snapshot
+# Uso: python bench_wal.py [lances] [leiloes] [threads]
+def gravar(log, total, leiloes, threads):
+    por_thread = total // threads
+
+    def worker(t):
+        for v in range(por_thread):
+            leilao = f"L{(t * por_thread + v) % leiloes}"
+            seq = log.anexar(["l", leilao, {"cliente": f"C{t}", "leilao": leilao, "valor": v, "venceu": False}])
+            log.esperar(seq)
+
+    ts = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    inicio = time.perf_counter()
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    return por_thread * threads, time.perf_counter() - inicio
+
+
+def medir_gravacao(nome, diretorio, total, leiloes, threads):
+    log = LogLances(diretorio, max_registros_segmento=10 ** 9)
+    log.recuperar()
+    n, tempo = gravar(log, total, leiloes, threads)
+    print(f"{nome:<28} {n:>8} lances  {tempo:7.2f}s  {n / tempo:9.0f} lances/s  "
+          f"{log.lotes} fsyncs ({log.gravados / max(log.lotes, 1):.0f} lances/fsync)")
+
+
+def medir_recuperacao(nome, diretorio):
+    log = LogLances(diretorio, max_registros_segmento=10 ** 9)
+    inicio = time.perf_counter()
+    estado = log.recuperar()
+    print(f"{nome:<28} {time.perf_counter() - inicio:7.2f}s  ({len(estado)} leilões)")
+    return log
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    leiloes = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 64
+    diretorio = tempfile.mkdtemp(prefix="bench_wal_")
+    try:
+        medir_gravacao("1 thread (fsync por lance)", tempfile.mkdtemp(dir=diretorio), min(total, 5000), leiloes, 1)
+        medir_gravacao(f"{threads} threads (group commit)", diretorio, total, leiloes, threads)
+        # a recuperação abre um segmento novo, então o log gravado acima fica fechado
+        log = medir_recuperacao("recuperação só do log", diretorio)
+        log.compactar()
+        medir_recuperacao("recuperação pelo snapshot", diretorio)
+    finally:
+        shutil.rmtree(diretorio)
+
+
+if __name__ == "__main__":
+    main()
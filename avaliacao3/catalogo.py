@@ -0,0 +1,144 @@
+import bisect
+import collections
+import heapq
+import itertools
+import threading
+
+ORDENS = ("inicio", "fim")
+TAMANHO_LOG = 10000
+
+
+def _a_partir(indice, pos):
+    # percorre a lista ordenada a partir de pos sem copiar a fatia
+    for i in range(pos, len(indice)):
+        yield indice[i]
+
+
+class CatalogoLeiloes:
+    # Catálogo de leilões indexado por id e por status, com listas ordenadas
+    # de (instante, id) por início e por fim para paginação por cursor.
+    # Os instantes são epoch (float), já convertidos na criação do leilão.
+    # Toda alteração incrementa a revisão e entra num log limitado, usado para
+    # responder deltas (mudancas_desde) sem reenviar o catálogo inteiro.
+    def __init__(self, tamanho_log=TAMANHO_LOG):
+        self._lock = threading.Lock()
+        self._revisao = 0
+        self._log = collections.deque(maxlen=tamanho_log)  # (revisao, id) das alterações
+        self._por_id = {}           # id -> leilao (dict)
+        self._instantes = {}        # id -> {"inicio": float, "fim": float}
+        self._indices = {}          # (ordem, status ou None) -> lista ordenada de (instante, id)
+
+    # ----- Índices -----
+    def _indice(self, ordem, status):
+        return self._indices.setdefault((ordem, status), [])
+
+    def _indexar(self, lid, status):
+        for ordem in ORDENS:
+            chave = (self._instantes[lid][ordem], lid)
+            for s in (None, status):
+                bisect.insort(self._indice(ordem, s), chave)
+
+    def _desindexar(self, lid, status):
+        for ordem in ORDENS:
+            chave = (self._instantes[lid][ordem], lid)
+            for s in (None, status):
+                indice = self._indice(ordem, s)
+                i = bisect.bisect_left(indice, chave)
+                if i < len(indice) and indice[i] == chave:
+                    del indice[i]
+
+    def _registrar(self, lid):
+        self._revisao += 1
+        self._log.append((self._revisao, lid))
+
+    # ----- Operações -----
+    def adicionar(self, leilao, inicio, fim):
+        lid = leilao["leilao"]
+        with self._lock:
+            if lid in self._por_id:
+                return False
+            self._por_id[lid] = leilao
+            self._instantes[lid] = {"inicio": inicio, "fim": fim}
+            self._indexar(lid, leilao["status"])
+            self._registrar(lid)
+            return True
+
+    def obter(self, lid):
+        with self._lock:
+            leilao = self._por_id.get(lid)
+            return dict(leilao) if leilao is not None else None
+
+    def alterar_status(self, lid, status):
+        with self._lock:
+            leilao = self._por_id.get(lid)
+            if leilao is None:
+                return None
+            if leilao["status"] != status:
+                self._desindexar(lid, leilao["status"])
+                leilao["status"] = status
+                self._indexar(lid, status)
+                self._registrar(lid)
+            return dict(leilao)
+
+    def remover(self, lid):
+        with self._lock:
+            leilao = self._por_id.pop(lid, None)
+            if leilao is None:
+                return None
+            self._desindexar(lid, leilao["status"])
+            del self._instantes[lid]
+            self._registrar(lid)
+            return leilao
+
+    def __len__(self):
+        with self._lock:
+            return len(self._por_id)
+
+    @property
+    def revisao(self):
+        with self._lock:
+            return self._revisao
+
+    def mudancas_desde(self, revisao):
+        # Retorna (revisao_atual, alterados, removidos), ou None se a revisão
+        # pedida já saiu do log e o cliente precisa buscar o catálogo completo.
+        with self._lock:
+            if revisao > self._revisao or revisao < 0:
+                return None
+            if revisao < self._revisao and (not self._log or self._log[0][0] > revisao + 1):
+                return None
+            ids = []
+            vistos = set()
+            for rev, lid in reversed(self._log):
+                if rev <= revisao:
+                    break
+                if lid not in vistos:
+                    vistos.add(lid)
+                    ids.append(lid)
+            alterados = [dict(self._por_id[lid]) for lid in ids if lid in self._por_id]
+            removidos = [lid for lid in ids if lid not in self._por_id]
+            return self._revisao, alterados, removidos
+
+    def listar(self, status=None, desde=None, cursor=None, limite=100, ordem="inicio"):
+        # status: lista de status aceitos (None = todos)
+        # desde: epoch mínimo do instante da ordem escolhida
+        # cursor: última chave (instante, id) da página anterior
+        # Retorna (página, chave da última linha ou None se não há mais páginas, revisão)
+        if ordem not in ORDENS:
+            raise ValueError(f"ordem deve ser uma de {ORDENS}")
+        with self._lock:
+            fatias = []
+            for s in (status or [None]):
+                indice = self._indices.get((ordem, s), [])
+                pos = 0
+                if desde is not None:
+                    pos = bisect.bisect_left(indice, (desde, ""))
+                if cursor is not None:
+                    pos = max(pos, bisect.bisect_right(indice, cursor))
+                fatias.append(_a_partir(indice, pos))
+            # limite + 1 só para saber se existe próxima página
+            chaves = list(itertools.islice(heapq.merge(*fatias), limite + 1))
+            pagina = [dict(self._por_id[lid]) for _, lid in chaves[:limite]]
+            revisao = self._revisao
+        proximo = chaves[limite - 1] if len(chaves) > limite else None
+        return pagina, proximo, revisao
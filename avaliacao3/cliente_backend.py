@@ -0,0 +1,144 @@
+import threading
+import time
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+
+# Headers que não devem ser repassados pelo proxy: são da conexão com o backend,
+# ou não valem mais porque resp.content já vem descomprimido
+HEADERS_DESCARTADOS = {"connection", "keep-alive", "transfer-encoding", "content-encoding", "content-length"}
+
+
+class BackendIndisponivel(Exception):
+    def __init__(self, backend, motivo):
+        super().__init__(f"{backend} indisponível: {motivo}")
+        self.backend = backend
+        self.motivo = motivo
+
+
+class ClienteBackend:
+    # Cliente HTTP de um backend do gateway:
+    #  - Session com keep-alive e no máximo max_conexoes conexões simultâneas;
+    #    quem espera mais de espera_conexao segundos por uma vaga recebe
+    #    BackendIndisponivel em vez de ficar bloqueado
+    #  - timeout de conexão/leitura em toda chamada
+    #  - retry só para GET (idempotente), limitado por um orçamento de retries:
+    #    cada requisição deposita proporcao_retry fichas e cada retry gasta uma,
+    #    então retries nunca passam de ~proporcao_retry do tráfego
+    #  - circuit breaker: falhas_para_abrir falhas seguidas abrem o circuito por
+    #    tempo_aberto segundos; depois disso uma requisição de teste é liberada
+    def __init__(self, nome, url_base, max_conexoes=20, timeout=(1.0, 5.0), tentativas_get=2,
+                 proporcao_retry=0.1, max_fichas=10.0, falhas_para_abrir=5, tempo_aberto=5.0,
+                 espera_conexao=2.0):
+        self.nome = nome
+        self.url_base = url_base
+        self.timeout = timeout
+        self.tentativas_get = tentativas_get
+        self.proporcao_retry = proporcao_retry
+        self.max_fichas = max_fichas
+        self.falhas_para_abrir = falhas_para_abrir
+        self.tempo_aberto = tempo_aberto
+        self.espera_conexao = espera_conexao
+
+        self.sessao = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=max_conexoes, pool_block=True)
+        self.sessao.mount("http://", adaptador)
+        self.sessao.mount("https://", adaptador)
+        # o pool do urllib3 com pool_block=True espera sem limite; as vagas são
+        # controladas aqui, com timeout
+        self._vagas = threading.BoundedSemaphore(max_conexoes)
+
+        self._lock = threading.Lock()
+        self._fichas = max_fichas
+        self._falhas = 0
+        self._aberto_ate = 0.0
+        self._testando = False
+
+    # ----- Circuit breaker -----
+    def _liberar(self):
+        # True se esta requisição é a de teste do meio-aberto
+        with self._lock:
+            if self._falhas < self.falhas_para_abrir:
+                return False
+            if time.monotonic() < self._aberto_ate or self._testando:
+                raise BackendIndisponivel(self.nome, "circuito aberto")
+            # meio-aberto: só esta requisição testa o backend
+            self._testando = True
+            return True
+
+    def _registrar(self, sucesso, testando):
+        # só o resultado da própria requisição de teste encerra o meio-aberto;
+        # uma requisição antiga terminando agora não libera um segundo teste
+        with self._lock:
+            if testando:
+                self._testando = False
+            if sucesso:
+                self._falhas = 0
+                return
+            self._falhas += 1
+            if self._falhas >= self.falhas_para_abrir:
+                self._aberto_ate = time.monotonic() + self.tempo_aberto
+                logging.warning(f"Circuito do backend {self.nome} aberto por {self.tempo_aberto}s")
+
+    # ----- Orçamento de retries -----
+    def _depositar(self):
+        with self._lock:
+            self._fichas = min(self.max_fichas, self._fichas + self.proporcao_retry)
+
+    def _gastar_ficha(self):
+        with self._lock:
+            if self._fichas < 1:
+                return False
+            self._fichas -= 1
+            return True
+
+    # ----- Requisições -----
+    def request(self, metodo, caminho, **kwargs):
+        testando = self._liberar()
+        try:
+            if not self._vagas.acquire(timeout=self.espera_conexao):
+                raise BackendIndisponivel(self.nome, "sem conexão livre")
+            try:
+                return self._tentar(metodo, caminho, testando, **kwargs)
+            finally:
+                self._vagas.release()
+        finally:
+            # qualquer exceção inesperada também encerra o teste do meio-aberto;
+            # senão o circuito ficaria aberto para sempre
+            if testando:
+                with self._lock:
+                    self._testando = False
+
+    def _tentar(self, metodo, caminho, testando, **kwargs):
+        self._depositar()
+        tentativas = self.tentativas_get if metodo == "GET" else 1
+        kwargs.setdefault("timeout", self.timeout)
+        for tentativa in range(1, tentativas + 1):
+            try:
+                resp = self.sessao.request(metodo, f"{self.url_base}{caminho}", **kwargs)
+            except requests.RequestException as e:
+                erro = e
+            else:
+                if resp.status_code < 500:
+                    self._registrar(True, testando)
+                    return resp
+                erro = None
+            if tentativa == tentativas or not self._gastar_ficha():
+                break
+            logging.info(f"Retry {tentativa} de GET {self.nome}{caminho}")
+        self._registrar(False, testando)
+        if erro is not None:
+            raise BackendIndisponivel(self.nome, erro)
+        return resp
+
+    def get(self, caminho, **kwargs):
+        return self.request("GET", caminho, **kwargs)
+
+    def post(self, caminho, **kwargs):
+        return self.request("POST", caminho, **kwargs)
+
+
+def repassar(resp):
+    # resposta do backend no formato (corpo, status, headers) do Flask
+    headers = [(k, v) for k, v in resp.headers.items() if k.lower() not in HEADERS_DESCARTADOS]
+    return resp.content, resp.status_code, headers
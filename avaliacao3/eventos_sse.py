@@ -0,0 +1,241 @@
+import json
+import time
+import itertools
+import threading
+import collections
+
+MAX_FRAMES_POR_ESCRITA = 64
+MAX_PENDENTES = 100         # frames pendentes antes de considerar o cliente lento
+MAX_ATRASO = 30.0           # segundos sem esvaziar a fila antes de considerar o cliente lento
+MAX_EVENTOS_POR_LEILAO = 256
+MAX_BYTES_HISTORICO = 8 * 1024 * 1024
+
+# Política por tipo de evento: atualizações de lance são conflacionadas por
+# leilão (só a mais recente interessa); os demais (leilao_vencedor,
+# link_pagamento, status_pagamento...) nunca são descartados.
+EVENTOS_CONFLAVEIS = {"lance_validado", "lance_invalido"}
+
+
+def montar_frame(evento, data, id_evento=None):
+    # Frame SSE completo e imutável (bytes): serializado uma vez por evento e
+    # compartilhado entre as filas de todos os assinantes
+    id_linha = f"id: {id_evento}\n" if id_evento is not None else ""
+    return f"{id_linha}event: {evento}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8")
+
+
+def chave_conflacao(evento, leilao):
+    if evento in EVENTOS_CONFLAVEIS:
+        return (evento, leilao)
+    return None
+
+
+class FilaSSE:
+    # Fila de frames de um cliente SSE.
+    #  - colocar(frame, chave): com chave, substitui o frame pendente de mesma
+    #    chave (conflação); sem chave, o frame é sempre entregue
+    #  - se o cliente acumula mais de max_pendentes frames ou fica mais de
+    #    max_atraso segundos sem esvaziar a fila, é marcado como lento: a fila
+    #    é liberada e o stream deve ser encerrado
+    #  - retirar() devolve todos os pendentes juntos, para uma escrita só
+    # ao_colocar é chamado a cada frame novo (o modo asyncio usa para acordar o stream).
+    def __init__(self, max_pendentes=MAX_PENDENTES, max_atraso=MAX_ATRASO, ao_colocar=None):
+        self.max_pendentes = max_pendentes
+        self.max_atraso = max_atraso
+        self._ao_colocar = ao_colocar
+        self._cond = threading.Condition()
+        self._pendentes = collections.OrderedDict()     # chave -> frame
+        self._seq = itertools.count()                   # chaves dos frames não conflacionáveis
+        self._desde = None                              # quando a fila deixou de estar vazia
+        self.retomar_de = None                          # Last-Event-ID informado na conexão
+        self.reenviados = set()                         # leilões já reenviados desde retomar_de
+        self.lento = False
+        self.enfileirados = 0
+        self.conflacionados = 0
+        self.entregues = 0
+        self.escritas = 0
+
+    def colocar(self, frame, chave=None):
+        with self._cond:
+            if self.lento:
+                return False
+            agora = time.monotonic()
+            if chave is None:
+                chave = next(self._seq)
+            elif self._pendentes.pop(chave, None) is not None:
+                self.conflacionados += 1
+            self._pendentes[chave] = frame
+            self.enfileirados += 1
+            if self._desde is None:
+                self._desde = agora
+            if len(self._pendentes) > self.max_pendentes or agora - self._desde > self.max_atraso:
+                self.lento = True
+                self._pendentes.clear()
+            self._cond.notify()
+        if self._ao_colocar:
+            self._ao_colocar()
+        return not self.lento
+
+    def __len__(self):
+        with self._cond:
+            return len(self._pendentes)
+
+    def aguarda_reenvio(self, leilao):
+        # Retomando de um Last-Event-ID e o leilão ainda não foi reenviado: os
+        # eventos dele ficam para o reenvio, que os tira do histórico, em vez
+        # de irem ao vivo e depois repetidos
+        return self.retomar_de is not None and leilao not in self.reenviados
+
+    def retirar_nowait(self):
+        with self._cond:
+            return self._tirar()
+
+    def retirar(self, timeout=None):
+        with self._cond:
+            if not self._pendentes and not self.lento:
+                self._cond.wait(timeout)
+            return self._tirar()
+
+    def _tirar(self):
+        frames = []
+        while self._pendentes and len(frames) < MAX_FRAMES_POR_ESCRITA:
+            frames.append(self._pendentes.popitem(last=False)[1])
+        if not self._pendentes:
+            self._desde = None
+        if not frames:
+            return None
+        self.entregues += len(frames)
+        self.escritas += 1
+        return b"".join(frames)
+
+    def metricas(self):
+        with self._cond:
+            return {
+                "pendentes": len(self._pendentes),
+                "atraso_s": round(time.monotonic() - self._desde, 3) if self._desde is not None else 0.0,
+                "enfileirados": self.enfileirados,
+                "conflacionados": self.conflacionados,
+                "entregues": self.entregues,
+                "escritas": self.escritas,
+                "lento": self.lento
+            }
+
+
+class HistoricoEventos:
+    # Buffer circular dos eventos recentes de cada leilão, para reenviar a
+    # partir do Last-Event-ID quando um cliente reconecta. Os ids são
+    # crescentes em todo o gateway e começam no horário atual em ms, então
+    # continuam crescendo depois de um restart. Cada leilão guarda no máximo
+    # max_por_leilao eventos, e o total é limitado a max_bytes, descartando
+    # os mais antigos. O id descartado mais recente de cada leilão só é
+    # guardado enquanto o leilão tem buffer; depois disso vale a marca global
+    # _descartado_global (pode pedir um resync a mais, nunca a menos).
+    # Enquanto o gateway não tem binding de um leilão os eventos dele não
+    # chegam aqui: vinculado() marca o bind como descarte, então quem retoma
+    # de um id anterior ao bind recebe resync em vez de um reenvio incompleto.
+    # Quem precisa decidir de forma atômica entre "vai no reenvio" e "vai ao
+    # vivo" (broadcast x registro de interesse) deve segurar `lock`.
+    def __init__(self, max_por_leilao=MAX_EVENTOS_POR_LEILAO, max_bytes=MAX_BYTES_HISTORICO):
+        self.lock = threading.RLock()
+        self.max_por_leilao = max_por_leilao
+        self.max_bytes = max_bytes
+        self._primeiro_id = int(time.time() * 1000)
+        self._ultimo_id = self._primeiro_id
+        self._por_leilao = {}               # leilao -> deque de (id, evento, frame)
+        self._descartado_ate = {}           # leilao com buffer -> maior id já descartado dele
+        self._descartado_global = 0         # maior id descartado de buffers que não existem mais
+        self._ordem = collections.deque()   # (id, leilao) em ordem global, para o descarte por memória
+        self._total = 0
+        self._bytes = 0
+
+    def registrar(self, leilao, evento, data):
+        with self.lock:
+            self._ultimo_id += 1
+            id_evento = self._ultimo_id
+            frame = montar_frame(evento, data, id_evento)
+            buffer = self._por_leilao.get(leilao)
+            if buffer is None:
+                buffer = self._por_leilao[leilao] = collections.deque()
+                self._descartado_ate[leilao] = self._descartado_global
+            # adiciona antes de cortar, para o buffer nunca ficar vazio aqui
+            buffer.append((id_evento, evento, frame))
+            if len(buffer) > self.max_por_leilao:
+                self._descartar(leilao)
+            self._ordem.append((id_evento, leilao))
+            self._total += 1
+            self._bytes += len(frame)
+            while self._bytes > self.max_bytes and self._ordem:
+                antigo, leilao_antigo = self._ordem.popleft()
+                buf = self._por_leilao.get(leilao_antigo)
+                if buf and buf[0][0] == antigo:
+                    self._descartar(leilao_antigo)
+            if len(self._ordem) > 2 * self._total + 1024:
+                # entradas já descartadas pelo limite por leilão ficam em _ordem; compacta
+                self._ordem = collections.deque(sorted(
+                    (i, l) for l, buf in self._por_leilao.items() for i, _, _ in buf))
+            return id_evento, frame
+
+    def _descartar(self, leilao):
+        buffer = self._por_leilao[leilao]
+        id_evento, _, frame = buffer.popleft()
+        self._descartado_ate[leilao] = max(self._descartado_ate[leilao], id_evento)
+        self._total -= 1
+        self._bytes -= len(frame)
+        if not buffer:
+            self._esquecer(leilao)
+
+    def _esquecer(self, leilao):
+        del self._por_leilao[leilao]
+        self._descartado_global = max(self._descartado_global, self._descartado_ate.pop(leilao))
+
+    def vinculado(self, leilao):
+        # Chamado depois do queue_bind: os eventos do leilão anteriores a este
+        # ponto podem ter sido perdidos. Consome um id para que até o cliente
+        # que viu o último evento do gateway fique antes da marca.
+        with self.lock:
+            self._ultimo_id += 1
+            if leilao not in self._por_leilao:
+                self._por_leilao[leilao] = collections.deque()
+            self._descartado_ate[leilao] = self._ultimo_id
+
+    def desvinculado(self, leilao):
+        # Depois do queue_unbind: um buffer vazio (só com a marca do bind) não
+        # precisa ficar, a marca passa para _descartado_global
+        with self.lock:
+            if leilao in self._por_leilao and not self._por_leilao[leilao]:
+                self._esquecer(leilao)
+
+    def desde(self, leiloes, ultimo_id):
+        # Eventos dos leilões com id > ultimo_id, em ordem, e se há lacuna
+        # (eventos que o cliente perdeu e que não estão mais no buffer)
+        with self.lock:
+            lacuna = ultimo_id < self._primeiro_id or ultimo_id > self._ultimo_id
+            eventos = []
+            for leilao in leiloes:
+                if ultimo_id < self._descartado_ate.get(leilao, self._descartado_global):
+                    lacuna = True
+                for item in reversed(self._por_leilao.get(leilao, ())):
+                    if item[0] <= ultimo_id:
+                        break
+                    eventos.append((leilao,) + item)
+            eventos.sort(key=lambda e: e[1])
+            return eventos, lacuna
+
+
+def reenviar(historico, fila, leiloes):
+    # Coloca na fila os eventos perdidos desde fila.retomar_de. Lances antigos
+    # do mesmo leilão são conflacionados como no envio ao vivo. Se parte do
+    # histórico já foi descartada, avisa o cliente com um evento "resync".
+    # Cada leilão é reenviado uma vez por conexão: depois do reenvio os
+    # eventos dele chegam ao vivo, então um novo POST /interesse do mesmo
+    # leilão não repete nada. Quem chama deve segurar historico.lock.
+    if fila.retomar_de is None:
+        return
+    leiloes = [leilao for leilao in leiloes if leilao not in fila.reenviados]
+    if not leiloes:
+        return
+    fila.reenviados.update(leiloes)
+    eventos, lacuna = historico.desde(leiloes, fila.retomar_de)
+    if lacuna:
+        fila.colocar(montar_frame("resync", {"desde": fila.retomar_de}), ("resync",))
+    for leilao, _, evento, frame in eventos:
+        fila.colocar(frame, chave_conflacao(evento, leilao))
@@ -0,0 +1,74 @@
+import threading
+
+
+class IndiceInteresses:
+    # Índice bidirecional de interesses: leilão -> clientes e cliente -> leilões.
+    # O broadcast consulta só os assinantes do leilão, em vez de varrer todos os
+    # clientes, e a desconexão de um cliente remove suas entradas dos dois lados.
+    # ao_mudar(leilao) é chamado, fora do lock, quando um leilão ganha o primeiro
+    # assinante ou perde o último (o gateway usa para o bind/unbind no RabbitMQ).
+    def __init__(self, ao_mudar=None):
+        self._lock = threading.Lock()
+        self._ao_mudar = ao_mudar
+        self._por_leilao = {}       # leilao -> set(clientes)
+        self._por_cliente = {}      # cliente -> set(leiloes)
+
+    def registrar(self, cliente, leilao):
+        with self._lock:
+            novo = leilao not in self._por_leilao
+            self._por_leilao.setdefault(leilao, set()).add(cliente)
+            self._por_cliente.setdefault(cliente, set()).add(leilao)
+        if novo:
+            self._avisar([leilao])
+
+    def _avisar(self, leiloes):
+        if self._ao_mudar:
+            for leilao in leiloes:
+                self._ao_mudar(leilao)
+
+    def _retirar(self, cliente, leilao):
+        # True se o leilão ficou sem assinantes
+        clientes = self._por_leilao.get(leilao)
+        if clientes is not None:
+            clientes.discard(cliente)
+            if not clientes:
+                del self._por_leilao[leilao]
+                return True
+        return False
+
+    def cancelar(self, cliente, leilao):
+        with self._lock:
+            leiloes = self._por_cliente.get(cliente)
+            if leiloes is None or leilao not in leiloes:
+                return False
+            leiloes.discard(leilao)
+            if not leiloes:
+                del self._por_cliente[cliente]
+            vazio = self._retirar(cliente, leilao)
+        if vazio:
+            self._avisar([leilao])
+        return True
+
+    def remover_cliente(self, cliente):
+        with self._lock:
+            leiloes = self._por_cliente.pop(cliente, set())
+            vazios = [leilao for leilao in leiloes if self._retirar(cliente, leilao)]
+        self._avisar(vazios)
+        return leiloes
+
+    def assinantes(self, leilao):
+        # cópia: o broadcast itera fora do lock
+        with self._lock:
+            return tuple(self._por_leilao.get(leilao, ()))
+
+    def leiloes_do_cliente(self, cliente):
+        with self._lock:
+            return set(self._por_cliente.get(cliente, ()))
+
+    def leiloes(self):
+        with self._lock:
+            return list(self._por_leilao)
+
+    def __contains__(self, leilao):
+        with self._lock:
+            return leilao in self._por_leilao
@@ -0,0 +1,178 @@
+import os
+import json
+import threading
+import logging
+
+MAX_REGISTROS_SEGMENTO = 200_000    # registros por segmento antes de rotacionar e compactar
+ARQUIVO_SNAPSHOT = "snapshot.json"
+
+
+def aplicar(estado, registro):
+    # registros: ["i", leilao] iniciado, ["l", leilao, lance] novo maior lance, ["f", leilao] finalizado
+    op, leilao = registro[0], registro[1]
+    if op == "i":
+        estado[leilao] = None
+    elif op == "l":
+        estado[leilao] = registro[2]
+    elif op == "f":
+        estado.pop(leilao, None)
+
+
+class LogLances:
+    # Write-ahead log do estado do ms_lance (leilão ativo -> maior lance).
+    #  - anexar() serializa o registro e devolve um número de sequência, sem
+    #    esperar o disco; deve ser chamado dentro do lock do leilão para que a
+    #    ordem no log seja a ordem das decisões
+    #  - esperar(seq) bloqueia até o registro estar em disco (fsync)
+    #  - uma única thread escritora grava tudo o que acumulou enquanto o fsync
+    #    anterior rodava (group commit): com carga, um fsync cobre muitos lances
+    #  - o log é dividido em segmentos; ao fechar um segmento, os segmentos
+    #    antigos são compactados num snapshot e apagados
+    # A recuperação lê o snapshot e reaplica os segmentos seguintes; uma linha
+    # incompleta no fim (queda no meio da escrita) é descartada.
+    def __init__(self, diretorio, max_registros_segmento=MAX_REGISTROS_SEGMENTO, fsync=True):
+        self.diretorio = diretorio
+        self.max_registros_segmento = max_registros_segmento
+        self.fsync = fsync
+        os.makedirs(diretorio, exist_ok=True)
+        lock = threading.Lock()
+        self._ha_pendentes = threading.Condition(lock)
+        self._gravado = threading.Condition(lock)
+        self._pendentes = []
+        self._seq = 0               # último registro anexado
+        self._duravel = 0           # último registro gravado com fsync
+        self._erro = None
+        self._arquivo = None
+        self._segmento = 0
+        self._registros_segmento = 0
+        self._compactando = threading.Lock()
+        self.lotes = 0
+        self.gravados = 0
+
+    # ----- Arquivos -----
+    def _caminho(self, segmento):
+        return os.path.join(self.diretorio, f"segmento_{segmento:08d}.log")
+
+    def _segmentos(self):
+        numeros = []
+        for nome in os.listdir(self.diretorio):
+            if nome.startswith("segmento_") and nome.endswith(".log"):
+                numeros.append(int(nome[len("segmento_"):-len(".log")]))
+        return sorted(numeros)
+
+    def _ler_snapshot(self):
+        try:
+            with open(os.path.join(self.diretorio, ARQUIVO_SNAPSHOT), "rb") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return {}, 0
+        return snapshot["leiloes"], snapshot["ate_segmento"]
+
+    def _gravar_snapshot(self, estado, ate_segmento):
+        caminho = os.path.join(self.diretorio, ARQUIVO_SNAPSHOT)
+        with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"ate_segmento": ate_segmento, "leiloes": estado}, f, ensure_ascii=False, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(caminho + ".tmp", caminho)
+        self._sincronizar_diretorio()
+
+    def _sincronizar_diretorio(self):
+        fd = os.open(self.diretorio, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _reaplicar(self, estado, segmento):
+        n = 0
+        with open(self._caminho(segmento), "rb") as f:
+            for linha in f:
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    logging.warning(f"Registro incompleto no fim do segmento {segmento}, descartado")
+                    break
+                aplicar(estado, registro)
+                n += 1
+        return n
+
+    def _abrir_segmento(self, segmento):
+        self._segmento = segmento
+        self._registros_segmento = 0
+        self._arquivo = open(self._caminho(segmento), "ab")
+        self._sincronizar_diretorio()
+
+    # ----- Recuperação -----
+    def recuperar(self):
+        # snapshot + segmentos seguintes; depois abre um segmento novo (nunca
+        # anexa depois de uma linha possivelmente incompleta) e liga a escritora
+        estado, ate = self._ler_snapshot()
+        segmentos = self._segmentos()
+        registros = sum(self._reaplicar(estado, s) for s in segmentos if s > ate)
+        logging.info(f"Log de lances: snapshot até o segmento {ate} + {registros} registros, "
+                     f"{len(estado)} leilões ativos")
+        self._abrir_segmento(max(segmentos + [ate]) + 1)
+        threading.Thread(target=self._escritor, daemon=True).start()
+        return estado
+
+    def compactar(self):
+        # junta snapshot + segmentos fechados num snapshot novo e apaga os segmentos
+        with self._compactando:
+            ate = self._segmento - 1
+            estado, anterior = self._ler_snapshot()
+            if ate <= anterior:
+                return
+            for s in self._segmentos():
+                if anterior < s <= ate:
+                    self._reaplicar(estado, s)
+            self._gravar_snapshot(estado, ate)
+            for s in self._segmentos():
+                if s <= ate:
+                    os.remove(self._caminho(s))
+            logging.info(f"Log de lances compactado até o segmento {ate} ({len(estado)} leilões)")
+
+    # ----- Escrita -----
+    def anexar(self, registro):
+        linha = json.dumps(registro, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        with self._ha_pendentes:
+            self._pendentes.append(linha)
+            self._seq += 1
+            self._ha_pendentes.notify()
+            return self._seq
+
+    def esperar(self, seq):
+        with self._gravado:
+            while self._duravel < seq and self._erro is None:
+                self._gravado.wait()
+            if self._duravel < seq:
+                raise self._erro
+
+    def _escritor(self):
+        while True:
+            with self._ha_pendentes:
+                while not self._pendentes:
+                    self._ha_pendentes.wait()
+                lote, self._pendentes = self._pendentes, []
+                ate = self._seq
+            try:
+                self._arquivo.write(b"".join(lote))
+                self._arquivo.flush()
+                if self.fsync:
+                    os.fsync(self._arquivo.fileno())
+            except OSError as e:
+                logging.exception(f"Falha ao gravar o log de lances: {e}")
+                with self._gravado:
+                    self._erro = e
+                    self._gravado.notify_all()
+                return
+            with self._gravado:
+                self._duravel = ate
+                self.lotes += 1
+                self.gravados += len(lote)
+                self._gravado.notify_all()
+            self._registros_segmento += len(lote)
+            if self._registros_segmento >= self.max_registros_segmento:
+                self._arquivo.close()
+                self._abrir_segmento(self._segmento + 1)
+                threading.Thread(target=self.compactar, daemon=True).start()
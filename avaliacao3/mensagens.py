@@ -0,0 +1,137 @@
+import json
+import struct
+
+# Formato das mensagens internas (RabbitMQ). O content_type da mensagem diz
+# como ler o corpo, então JSON e binário convivem e cada publicador escolhe.
+#
+# Binário v1: [versão][id do esquema][campos na ordem do esquema]
+#   "s"   texto: tamanho (varint) + UTF-8
+#   "s?"  texto ou None: 0 = None, 1 + texto
+#   "n"   número: 0 + inteiro (varint zigzag, até 64 bits) ou 1 + float64
+#   "?"   bool: 1 byte
+# Só é usado quando o payload tem exatamente os campos de um esquema e com os
+# tipos certos; qualquer outro payload (campos extras, tipos inesperados) vai
+# em JSON, então decodificar() sempre devolve o mesmo dict que foi publicado.
+# Mudança incompatível nos esquemas = nova VERSAO; esquemas novos ganham ids novos.
+CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_BINARIO = "application/x-leilao"
+VERSAO = 1
+FORMATO_PADRAO = CONTENT_TYPE_BINARIO
+
+ESQUEMAS = {
+    1: ("lance", [("cliente", "s"), ("leilao", "s"), ("valor", "n"), ("venceu", "?")]),
+    2: ("leilao", [("leilao", "s"), ("descricao", "s"), ("inicio", "s"), ("fim", "s"), ("status", "s")]),
+    3: ("link_pagamento", [("transaction_id", "s"), ("link", "s"), ("leilao", "s"), ("vencedor", "s"),
+                           ("valor", "n")]),
+    4: ("status_pagamento", [("transaction_id", "s"), ("status", "s"), ("info", "s?")]),
+}
+_POR_CAMPOS = {frozenset(c for c, _ in campos): id_esquema for id_esquema, (_, campos) in ESQUEMAS.items()}
+_FLOAT = struct.Struct("<d")
+_LIMITE_INT = 1 << 63
+
+
+# ----- Codificação -----
+def codificar(payload, formato=FORMATO_PADRAO):
+    # devolve (content_type, corpo)
+    if formato == CONTENT_TYPE_BINARIO:
+        corpo = codificar_binario(payload)
+        if corpo is not None:
+            return CONTENT_TYPE_BINARIO, corpo
+    return CONTENT_TYPE_JSON, json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def codificar_binario(payload):
+    # None se o payload não se encaixa em nenhum esquema
+    id_esquema = _POR_CAMPOS.get(frozenset(payload))
+    if id_esquema is None:
+        return None
+    out = bytearray((VERSAO, id_esquema))
+    for campo, tipo in ESQUEMAS[id_esquema][1]:
+        valor = payload[campo]
+        if tipo == "s?":
+            if valor is None:
+                out.append(0)
+                continue
+            out.append(1)
+            tipo = "s"
+        if tipo == "s":
+            if type(valor) is not str:
+                return None
+            dados = valor.encode("utf-8")
+            _varint(len(dados), out)
+            out += dados
+        elif tipo == "n":
+            if type(valor) is int and -_LIMITE_INT <= valor < _LIMITE_INT:
+                out.append(0)
+                _varint((valor << 1) ^ (valor >> 63), out)
+            elif type(valor) is float:
+                out.append(1)
+                out += _FLOAT.pack(valor)
+            else:
+                return None
+        elif tipo == "?":
+            if type(valor) is not bool:
+                return None
+            out.append(valor)
+    return bytes(out)
+
+
+def _varint(n, out):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+# ----- Decodificação -----
+def decodificar(corpo, content_type=None):
+    # mensagens sem content_type são de publicadores antigos: JSON
+    if content_type == CONTENT_TYPE_BINARIO:
+        return decodificar_binario(corpo)
+    return json.loads(corpo)
+
+
+def decodificar_binario(corpo):
+    if len(corpo) < 2 or corpo[0] != VERSAO:
+        raise ValueError(f"versão de mensagem binária não suportada: {corpo[:1]!r}")
+    esquema = ESQUEMAS.get(corpo[1])
+    if esquema is None:
+        raise ValueError(f"esquema de mensagem desconhecido: {corpo[1]}")
+    payload = {}
+    pos = 2
+    for campo, tipo in esquema[1]:
+        if tipo == "s?":
+            pos += 1
+            if corpo[pos - 1] == 0:
+                payload[campo] = None
+                continue
+            tipo = "s"
+        if tipo == "s":
+            n, pos = _ler_varint(corpo, pos)
+            payload[campo] = corpo[pos:pos + n].decode("utf-8")
+            pos += n
+        elif tipo == "n":
+            if corpo[pos] == 0:
+                n, pos = _ler_varint(corpo, pos + 1)
+                payload[campo] = (n >> 1) ^ -(n & 1)
+            else:
+                payload[campo] = _FLOAT.unpack_from(corpo, pos + 1)[0]
+                pos += 1 + _FLOAT.size
+        elif tipo == "?":
+            payload[campo] = corpo[pos] == 1
+            pos += 1
+    if pos != len(corpo):
+        raise ValueError("mensagem binária com tamanho inválido")
+    return payload
+
+
+def _ler_varint(corpo, pos):
+    n = 0
+    deslocamento = 0
+    while True:
+        b = corpo[pos]
+        pos += 1
+        n |= (b & 0x7F) << deslocamento
+        if b < 0x80:
+            return n, pos
+        deslocamento += 7
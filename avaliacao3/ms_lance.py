@@ -1,38 +1,69 @@
+import os
+import sys
 import threading
 import time
+import queue
 import pika
-import json
 from flask import Flask, request, jsonify
 import logging
+from publicador import Publicador, rota_leilao
+from particoes import shard_do_leilao, particoes_do_shard, rota_particao, porta_shard, N_PARTICOES
+from log_lances import LogLances
+from consumidor import Consumidor
+from mensagens import decodificar
 
 EXCHANGE_NAME = "leilao_control"
 RABBITMQ_HOST = "localhost"
-PORT = 5002
+# python ms_lance.py [shard] [n_shards]: cada processo é dono de uma fração das partições
+SHARD = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+N_SHARDS = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+PORT = porta_shard(SHARD, N_SHARDS)
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
+N_LOCKS = 64
 leiloes_ativos = {}
-ativos_lock = threading.Lock()
+locks_leiloes = [threading.Lock() for _ in range(N_LOCKS)]    # lock striping por id do leilão
+fila_saida = queue.Queue()                                    # eventos decididos aguardando publicação
+publicador = Publicador(host=RABBITMQ_HOST, exchange=EXCHANGE_NAME)
+# leiloes_ativos sobrevive a restarts; ao lado do módulo, independente do diretório atual
+wal = LogLances(os.path.join(os.path.dirname(os.path.abspath(__file__)), f"dados_lance_{SHARD}"))
 
 
-# ----- RabbitMQ -----
-def get_channel():
-    params = pika.ConnectionParameters(host=RABBITMQ_HOST)
-    conn = pika.BlockingConnection(params)
-    ch = conn.channel()
-    ch.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
-    return conn, ch
+# ----- Utilitários -----
+def lock_do_leilao(leilao):
+    # leilões diferentes caem (quase sempre) em locks diferentes,
+    # então lances em leilões distintos não se bloqueiam
+    return locks_leiloes[hash(leilao) % N_LOCKS]
 
-def publicar(routing_key, payload):
+
+# ----- RabbitMQ -----
+def publicar(routing_key, payload, tipo=None):
     try:
-        conn, ch = get_channel()
-        ch.basic_publish(exchange=EXCHANGE_NAME, routing_key=routing_key,
-                         body=json.dumps(payload, ensure_ascii=False).encode("utf-8"))
-        conn.close()
-        logging.info(f"Publicado {routing_key} -> {payload}")
+        publicador.publicar(routing_key, payload, tipo)
+        logging.info(f"Publicado {tipo or routing_key} ({routing_key}) -> {payload}")
     except Exception as e:
         logging.exception(f"[!] erro ao publicar: {e}")
 
 
+def enfileirar(routing_key, payload, tipo=None, seq=None):
+    # chamado dentro do lock do leilão: a ordem da fila é a ordem das decisões.
+    # seq: registro do log que precisa estar em disco antes da publicação
+    fila_saida.put((routing_key, payload, tipo, seq))
+
+
+def publicador_worker():
+    # única thread consumindo fila_saida, mantendo a ordem de publicação
+    while True:
+        routing_key, payload, tipo, seq = fila_saida.get()
+        try:
+            if seq is not None:
+                wal.esperar(seq)
+            publicar(routing_key, payload, tipo)
+        except OSError as e:
+            logging.error(f"Evento {tipo or routing_key} não publicado, log de lances indisponível: {e}")
+        fila_saida.task_done()
+
+
 # ----- Endpoints -----
 @app.route("/lances", methods=["POST"])
 def receber_lance():
@@ -40,11 +71,16 @@ def receber_lance():
     if not data or "cliente" not in data or "leilao" not in data or "valor" not in data:
         return jsonify({"error":"cliente, leilao e valor required"}), 400
     leilao = data["leilao"]
+    dono = shard_do_leilao(leilao, N_SHARDS)
+    if dono != SHARD:
+        # gateway configurado com outro número de shards
+        return jsonify({"ok": False, "reason": f"leilao pertence ao shard {dono}"}), 421
     com_valor = None
-    with ativos_lock:
+    seq = None
+    with lock_do_leilao(leilao):
         if leilao not in leiloes_ativos:
             logging.info(f"Lance recebido para leilao inativo/inexistente: {leilao}")
-            publicar("lance_invalidado", data)
+            enfileirar(rota_leilao(leilao), data, "lance_invalidado")
             return jsonify({"ok": False, "reason": "leilao inativo/inexistente"}), 400
         atual = leiloes_ativos[leilao]
         if atual is None:
@@ -61,50 +97,90 @@ def receber_lance():
         if com_valor:
             data["venceu"] = False
             leiloes_ativos[leilao] = data
-            publicar("lance_validado", data)
-            return jsonify({"ok": True}), 200
+            seq = wal.anexar(["l", leilao, data])
+            enfileirar(rota_leilao(leilao), data, "lance_validado", seq)
         else:
-            publicar("lance_invalidado", data)
+            enfileirar(rota_leilao(leilao), data, "lance_invalidado")
             return jsonify({"ok": False, "reason": "valor menor ou igual ao atual"}), 400
+    # fora do lock: o fsync em grupo cobre os lances que chegarem enquanto isso
+    try:
+        wal.esperar(seq)
+    except OSError:
+        return jsonify({"ok": False, "reason": "log de lances indisponivel"}), 503
+    return jsonify({"ok": True}), 200
 
 
 # ----- Main -----
 def rabbit_consumer():
-    logging.info("Conectando RabbitMQ (MS Lance)...")
+    logging.info(f"Conectando RabbitMQ (MS Lance, shard {SHARD}/{N_SHARDS})...")
     params = pika.ConnectionParameters(host=RABBITMQ_HOST)
     conn = pika.BlockingConnection(params)
     ch = conn.channel()
     ch.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
 
-    result = ch.queue_declare(queue='', exclusive=True)
-    fila = result.method.queue
-    for rk in ['leilao_iniciado', 'leilao_finalizado']:
-        ch.queue_bind(exchange=EXCHANGE_NAME, queue=fila, routing_key=rk)
+    # fila durável e nomeada por shard: eventos publicados enquanto o shard
+    # está fora ficam esperando, e o que não teve ack é reentregue no restart
+    # (o estado recuperado do log não fica com leilões que já encerraram)
+    fila = f"lance_shard_{SHARD}"
+    ch.queue_declare(queue=fila, durable=True)
+    # só os eventos de ciclo de vida das partições deste shard; bindings de
+    # uma execução com outro N_SHARDS são removidos
+    minhas = set(particoes_do_shard(SHARD, N_SHARDS))
+    for p in range(N_PARTICOES):
+        if p in minhas:
+            ch.queue_bind(exchange=EXCHANGE_NAME, queue=fila, routing_key=rota_particao(p))
+        else:
+            ch.queue_unbind(exchange=EXCHANGE_NAME, queue=fila, routing_key=rota_particao(p))
+
+    lote = {"seq": None}    # último registro do log anexado pelo lote ainda sem ack
+
+    def esperar_lote():
+        # ack só depois dos registros do lote estarem em disco: um fsync cobre o lote.
+        # Com o log indisponível o lote fica sem ack e o consumidor para; as
+        # mensagens voltam para a fila do shard e são reprocessadas no restart,
+        # a partir do estado que chegou ao disco
+        if lote["seq"] is not None:
+            try:
+                wal.esperar(lote["seq"])
+            except OSError as e:
+                logging.error(f"Log de lances indisponível, lote sem ack: {e}")
+                return False
+            lote["seq"] = None
 
     def callback(ch, method, properties, body):
         try:
-            rk = method.routing_key
-            payload = json.loads(body.decode("utf-8"))
+            rk = properties.type
+            payload = decodificar(body, properties.content_type)
             lid = str(payload.get("leilao"))
             logging.info(f"Evento {rk} recebido: {payload}")
-            with ativos_lock:
+            seq = None
+            with lock_do_leilao(lid):
                 if rk == 'leilao_iniciado':
-                    leiloes_ativos[lid] = None
+                    # reentrega depois de um restart não apaga os lances já recuperados
+                    if lid not in leiloes_ativos:
+                        leiloes_ativos[lid] = None
+                        seq = wal.anexar(["i", lid])
                 elif rk == 'leilao_finalizado':
+                    seq = wal.anexar(["f", lid])
                     vencedor = leiloes_ativos.get(lid)
                     if vencedor is not None:
-                        vencedor['venceu'] = True
-                        publicar('leilao_vencedor', vencedor)
+                        # cópia: o lance_validado desse mesmo dict pode ainda estar na fila_saida
+                        vencedor = dict(vencedor, venceu=True)
+                        enfileirar('leilao_vencedor', vencedor, seq=seq)                # ms_pagamento
+                        enfileirar(rota_leilao(lid), vencedor, 'leilao_vencedor', seq)  # gateways
                     if lid in leiloes_ativos:
                         del leiloes_ativos[lid]
+            if seq is not None:
+                lote["seq"] = seq
         except Exception as e:
             logging.exception(f"Erro processando evento: {e}")
-        finally:
-            ch.basic_ack(delivery_tag=method.delivery_tag)
 
-    ch.basic_consume(queue=fila, on_message_callback=callback)
+    consumidor = Consumidor(conn, ch, antes_do_ack=esperar_lote)
+    consumidor.consumir(fila, callback)
     try:
-        ch.start_consuming()
+        consumidor.rodar()
+        if consumidor.parado:
+            logging.error("Consumidor do RabbitMQ parado; reinicie o shard depois de resolver o log de lances")
     except Exception as e:
         logging.exception(f"Rabbit consumer ended: {e}")
     finally:
@@ -114,5 +190,9 @@ def rabbit_consumer():
             pass
 
 if __name__ == "__main__":
+    inicio = time.perf_counter()
+    leiloes_ativos.update(wal.recuperar())
+    logging.info(f"Estado recuperado em {time.perf_counter() - inicio:.2f}s: {len(leiloes_ativos)} leilões ativos")
+    threading.Thread(target=publicador_worker, daemon=True).start()
     threading.Thread(target=rabbit_consumer, daemon=True).start()
     app.run(host="0.0.0.0", port=PORT, threaded=True)
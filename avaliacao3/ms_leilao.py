@@ -1,40 +1,46 @@
 import threading
 from datetime import datetime, timedelta
 from flask import Flask, request, jsonify
-import pika
-import json
-import time
 import os
+from publicador import Publicador
+from agendador import Agendador
+from catalogo import CatalogoLeiloes
+from particoes import rota_do_leilao
 
 EXCHANGE_NAME = "leilao_control"
 RABBITMQ_HOST = "localhost"
 FORMATO_TIME = "%Y-%m-%d %H:%M:%S"
 PORT = 5001
+LIMITE_PAGINA = 100
+LIMITE_PAGINA_MAX = 1000
 app = Flask(__name__)
-leiloes = []
-leiloes_lock = threading.Lock()
+catalogo = CatalogoLeiloes()
+publicador = Publicador(host=RABBITMQ_HOST, exchange=EXCHANGE_NAME)
 
 
 # ----- RabbitMQ -----
-def get_channel():
-    params = pika.ConnectionParameters(host=RABBITMQ_HOST)
-    conn = pika.BlockingConnection(params)
-    ch = conn.channel()
-    ch.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
-    return conn, ch
-
-
-def publicar_leilao(leilao, routing_key):
+def publicar_leilao(leilao, evento):
+    # vai só para o shard do ms_lance dono da partição do leilão
     try:
-        conn, ch = get_channel()
-        msg = json.dumps(leilao, ensure_ascii=False).encode("utf-8")
-        ch.basic_publish(exchange=EXCHANGE_NAME, routing_key=routing_key, body=msg)
-        conn.close()
-        print(f"[x] publicado {routing_key} -> {leilao['leilao']}")
+        publicador.publicar(rota_do_leilao(leilao["leilao"]), leilao, evento)
+        print(f"[x] publicado {evento} -> {leilao['leilao']}")
     except Exception as e:
         print(f"[!] erro ao publicar: {e}")
 
 
+# ----- Utilitários -----
+def nao_modificado(revisao):
+    # If-None-Match com a revisão atual: nada mudou, responde 304 sem serializar
+    return request.if_none_match.contains(str(revisao))
+
+
+def versionar(resp, revisao):
+    resp.set_etag(str(revisao))
+    resp.headers["X-Revisao"] = str(revisao)
+    resp.headers["Cache-Control"] = "no-cache"
+    return resp
+
+
 # ----- Endpoints -----
 @app.route("/leiloes", methods=["POST"])
 def criar_leilao():
@@ -45,46 +51,101 @@ def criar_leilao():
     for k in required:
         if k not in data:
             return jsonify({"error": f"{k} required"}), 400
-    with leiloes_lock:
-        for l in leiloes:
-            if l["leilao"] == data["leilao"]:
-                return jsonify({"erro":"leilao já existe"}), 400
-        leilao = {
-            "leilao": str(data["leilao"]),
-            "descricao": data["descricao"],
-            "inicio": data["inicio"],
-            "fim": data["fim"],
-            "status": "programado"
-        }
-        leiloes.append(leilao)
+    try:
+        # datas convertidas uma única vez, na criação, para o agendador
+        inicio = datetime.strptime(data["inicio"], FORMATO_TIME).timestamp()
+        fim = datetime.strptime(data["fim"], FORMATO_TIME).timestamp()
+    except (TypeError, ValueError):
+        return jsonify({"error": f"inicio e fim devem estar no formato {FORMATO_TIME}"}), 400
+    leilao = {
+        "leilao": str(data["leilao"]),
+        "descricao": data["descricao"],
+        "inicio": data["inicio"],
+        "fim": data["fim"],
+        "status": "programado"
+    }
+    if not catalogo.adicionar(leilao, inicio, fim):
+        return jsonify({"erro":"leilao já existe"}), 400
+    agendador.agendar(inicio, ("leilao_iniciado", leilao["leilao"]))
+    agendador.agendar(max(inicio, fim), ("leilao_finalizado", leilao["leilao"]))
     return jsonify({"ok": True, "leilao": leilao}), 201
 
 
+# Parâmetros de GET /leiloes:
+#   status=ativo,programado   filtra por status
+#   since=<FORMATO_TIME>      só leilões com inicio (ou fim, se ordem=fim) a partir dessa data
+#   ordem=inicio|fim          ordenação da listagem (padrão: inicio)
+#   limit=N                   tamanho da página
+#   cursor=<X-Proximo-Cursor> continua a partir da página anterior
+# O corpo continua sendo uma lista; o cursor da próxima página vem no
+# header X-Proximo-Cursor, ausente na última página. A revisão do catálogo
+# vem no ETag/X-Revisao e If-None-Match com ela devolve 304.
 @app.route("/leiloes", methods=["GET"])
 def listar_leiloes():
-    with leiloes_lock:
-        return jsonify(leiloes)
+    revisao = catalogo.revisao
+    if nao_modificado(revisao):
+        return versionar(app.response_class(status=304), revisao)
+    args = request.args
+    status = None
+    if args.get("status"):
+        status = sorted(set(args["status"].split(",")))
+    ordem = args.get("ordem", "inicio")
+    try:
+        limite = min(max(int(args.get("limit", LIMITE_PAGINA)), 1), LIMITE_PAGINA_MAX)
+        desde = None
+        if args.get("since"):
+            desde = datetime.strptime(args["since"], FORMATO_TIME).timestamp()
+        cursor = None
+        if args.get("cursor"):
+            instante, lid = args["cursor"].split(":", 1)
+            cursor = (float(instante), lid)
+        pagina, proximo, revisao = catalogo.listar(status=status, desde=desde, cursor=cursor,
+                                                   limite=limite, ordem=ordem)
+    except ValueError as e:
+        return jsonify({"error": f"parametro invalido: {e}"}), 400
+    resp = jsonify(pagina)
+    if proximo is not None:
+        resp.headers["X-Proximo-Cursor"] = f"{proximo[0]!r}:{proximo[1]}"
+    return versionar(resp, revisao)
+
+
+# Delta do catálogo: GET /leiloes/delta?since_rev=N devolve só o que mudou
+# depois da revisão N. Se N já saiu do log de alterações, responde 410 e o
+# cliente deve refazer a listagem completa.
+@app.route("/leiloes/delta", methods=["GET"])
+def delta_leiloes():
+    try:
+        desde = int(request.args["since_rev"])
+    except (KeyError, ValueError):
+        return jsonify({"error": "since_rev required"}), 400
+    revisao = catalogo.revisao
+    if nao_modificado(revisao):
+        return versionar(app.response_class(status=304), revisao)
+    mudancas = catalogo.mudancas_desde(desde)
+    if mudancas is None:
+        return versionar(jsonify({"error": "revisao expirada", "revisao": revisao}), revisao), 410
+    revisao, alterados, removidos = mudancas
+    return versionar(jsonify({"revisao": revisao, "alterados": alterados, "removidos": removidos}), revisao)
 
 
 # ----- Main -----
-def scheduler_loop(poll_seconds=1):
-    while True:
-        now = datetime.now()
-        remover = []
-        with leiloes_lock:
-            for leilao in leiloes:
-                inicio = datetime.strptime(leilao["inicio"], FORMATO_TIME)
-                fim = datetime.strptime(leilao["fim"], FORMATO_TIME)
-                if leilao["status"] != "ativo" and now >= inicio:
-                    leilao["status"] = "ativo"
-                    publicar_leilao(leilao, "leilao_iniciado")
-                if leilao["status"] == "ativo" and now >= fim:
-                    publicar_leilao(leilao, "leilao_finalizado")
-                    remover.append(leilao)
-            for l in remover:
-                leiloes.remove(l)
-                print(f"[x] leilao removido da lista -> {l['leilao']}")
-        time.sleep(poll_seconds)
+def disparar_evento(instante, evento):
+    routing_key, lid = evento
+    if routing_key == "leilao_iniciado":
+        leilao = catalogo.alterar_status(lid, "ativo")
+    else:
+        leilao = catalogo.remover(lid)
+        if leilao is not None:
+            print(f"[x] leilao removido da lista -> {lid}")
+    if leilao is not None:
+        publicar_leilao(leilao, routing_key)
+
+
+agendador = Agendador(disparar_evento)
+
+
+def scheduler_loop():
+    agendador.rodar()
 
 
 if __name__ == "__main__":
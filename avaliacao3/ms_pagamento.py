@@ -1,4 +1,3 @@
-import json
 import threading
 import time
 import uuid
@@ -6,6 +5,9 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import pika
 import logging
+from publicador import Publicador, rota_leilao
+from consumidor import Consumidor
+from mensagens import decodificar
 import requests
 
 EXCHANGE_NAME = "leilao_control"
@@ -14,23 +16,14 @@ PORT = 5003
 app = Flask(__name__)
 CORS(app)
 logging.basicConfig(level=logging.INFO)
+publicador = Publicador(host=RABBITMQ_HOST, exchange=EXCHANGE_NAME)
 
 
 # ----- RabbitMQ -----
-def get_channel():
-    params = pika.ConnectionParameters(host=RABBITMQ_HOST)
-    conn = pika.BlockingConnection(params)
-    ch = conn.channel()
-    ch.exchange_declare(exchange=EXCHANGE_NAME, exchange_type="direct")
-    return conn, ch
-
-def publicar(routing_key, payload):
+def publicar(routing_key, payload, tipo=None):
     try:
-        conn, ch = get_channel()
-        ch.basic_publish(exchange=EXCHANGE_NAME, routing_key=routing_key,
-                         body=json.dumps(payload, ensure_ascii=False).encode("utf-8"))
-        conn.close()
-        logging.info(f"Publicado {routing_key} -> {payload}")
+        publicador.publicar(routing_key, payload, tipo)
+        logging.info(f"Publicado {tipo or routing_key} ({routing_key}) -> {payload}")
     except Exception as e:
         logging.exception(f"Erro publishing: {e}")
 
@@ -48,7 +41,7 @@ def rabbit_consumer():
 
     def callback(ch, method, properties, body):
         try:
-            payload = json.loads(body.decode("utf-8"))
+            payload = decodificar(body, properties.content_type)
             logging.info(f"Leilao vencedor recebido: {payload}")
             transaction_id = str(uuid.uuid4())
             link = f"http://mock-payments.local/pay/{transaction_id}"
@@ -59,15 +52,14 @@ def rabbit_consumer():
                 "vencedor": payload.get("cliente"),
                 "valor": payload.get("valor")
             }
-            publicar("link_pagamento", message)
+            publicar(rota_leilao(message["leilao"]), message, "link_pagamento")
         except Exception as e:
             logging.exception(f"Erro processando leilao_vencedor: {e}")
-        finally:
-            ch.basic_ack(delivery_tag=method.delivery_tag)
 
-    ch.basic_consume(queue=fila, on_message_callback=callback)
+    consumidor = Consumidor(conn, ch)
+    consumidor.consumir(fila, callback)
     try:
-        ch.start_consuming()
+        consumidor.rodar()
     except Exception as e:
         logging.exception(f"Rabbit consumer ended: {e}")
     finally:
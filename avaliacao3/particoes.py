@@ -0,0 +1,36 @@
+import zlib
+
+# Particionamento do ms_lance por id do leilão. Os ids caem em N_PARTICOES
+# partições fixas (hash estável, igual em todos os processos) e cada shard é
+# dono das partições p com p % n_shards == shard. O ms_leilao publica os
+# eventos de ciclo de vida na routing key da partição, sem precisar saber
+# quantos shards existem; o gateway usa a mesma conta para rotear os lances.
+N_PARTICOES = 64
+PORTA_LANCE = 5002          # modo com um único processo
+PORTA_BASE_SHARDS = 5200    # shard i em PORTA_BASE_SHARDS + i
+
+
+def particao(leilao):
+    # hash() do Python muda a cada execução (PYTHONHASHSEED), crc32 não
+    return zlib.crc32(str(leilao).encode("utf-8")) % N_PARTICOES
+
+
+def shard_do_leilao(leilao, n_shards):
+    return particao(leilao) % n_shards
+
+
+def particoes_do_shard(shard, n_shards):
+    return [p for p in range(N_PARTICOES) if p % n_shards == shard]
+
+
+def rota_particao(p):
+    # routing key dos eventos leilao_iniciado/leilao_finalizado (nome em properties.type)
+    return f"lance_p{p}"
+
+
+def rota_do_leilao(leilao):
+    return rota_particao(particao(leilao))
+
+
+def porta_shard(shard, n_shards):
+    return PORTA_LANCE if n_shards == 1 else PORTA_BASE_SHARDS + shard
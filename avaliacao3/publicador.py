@@ -0,0 +1,122 @@
+import queue
+import threading
+import logging
+import pika
+from mensagens import codificar, FORMATO_PADRAO
+
+EXCHANGE_NAME = "leilao_control"
+RABBITMQ_HOST = "localhost"
+
+# Erros que indicam conexão/canal inutilizável: a conexão é descartada e o envio repetido
+ERROS_CONEXAO = (pika.exceptions.AMQPConnectionError,
+                 pika.exceptions.AMQPChannelError,
+                 pika.exceptions.StreamLostError,
+                 ConnectionError)
+
+
+def rota_leilao(leilao):
+    # Eventos de um leilão destinados aos gateways vão na routing key do próprio
+    # leilão, com o nome do evento em properties.type: cada gateway só faz bind
+    # dos leilões em que seus clientes estão interessados
+    return f"leilao_{leilao}"
+
+
+class Publicador:
+    # Pool de conexões persistentes com o RabbitMQ, compartilhado entre as threads do Flask.
+    # BlockingConnection não é thread-safe, então cada conexão é usada por uma thread
+    # de cada vez e devolvida ao pool depois do envio.
+    def __init__(self, host=RABBITMQ_HOST, exchange=EXCHANGE_NAME, tamanho_pool=4,
+                 confirmar=False, tentativas=2, formato=FORMATO_PADRAO):
+        if tentativas < 1:
+            raise ValueError("tentativas deve ser pelo menos 1")
+        self.host = host
+        self.exchange = exchange
+        self.confirmar = confirmar          # publisher confirms: basic_publish espera o ack do broker
+        self.tentativas = tentativas
+        self.formato = formato              # content_type preferido (mensagens.py); JSON continua aceito
+        self._livres = queue.LifoQueue()    # LIFO reaproveita a conexão mais "quente"
+        self._vagas = threading.BoundedSemaphore(tamanho_pool)
+        self._todas = set()
+        self._todas_lock = threading.Lock()
+
+    # ----- Pool -----
+    def _abrir(self):
+        params = pika.ConnectionParameters(host=self.host)
+        conn = pika.BlockingConnection(params)
+        try:
+            ch = conn.channel()
+            ch.exchange_declare(exchange=self.exchange, exchange_type="direct")
+            if self.confirmar:
+                ch.confirm_delivery()
+        except Exception:
+            # a conexão ainda não está no pool: fecha aqui para não vazar
+            try:
+                conn.close()
+            except Exception:
+                pass
+            raise
+        with self._todas_lock:
+            self._todas.add(conn)
+        return conn, ch
+
+    def _descartar(self, conn):
+        with self._todas_lock:
+            self._todas.discard(conn)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _obter(self):
+        while True:
+            try:
+                conn, ch = self._livres.get_nowait()
+            except queue.Empty:
+                return self._abrir()
+            if conn.is_open and ch.is_open:
+                try:
+                    # atende heartbeats pendentes da conexão ociosa
+                    conn.process_data_events(time_limit=0)
+                    return conn, ch
+                except ERROS_CONEXAO:
+                    pass
+            self._descartar(conn)
+
+    # ----- Envio -----
+    def publicar(self, routing_key, payload, tipo=None):
+        content_type, body = codificar(payload, self.formato)
+        return self.publicar_bytes(routing_key, body, tipo, content_type)
+
+    def publicar_bytes(self, routing_key, body, tipo=None, content_type=None):
+        properties = pika.BasicProperties(type=tipo, content_type=content_type)
+        ultimo_erro = None
+        with self._vagas:
+            for _ in range(self.tentativas):
+                conn = None
+                try:
+                    conn, ch = self._obter()
+                    ch.basic_publish(exchange=self.exchange, routing_key=routing_key, body=body,
+                                     properties=properties)
+                    self._livres.put((conn, ch))
+                    return True
+                except pika.exceptions.NackError:
+                    # broker recusou a mensagem, mas a conexão continua válida
+                    self._livres.put((conn, ch))
+                    logging.warning(f"Mensagem {routing_key} recusada pelo broker (nack)")
+                    return False
+                except ERROS_CONEXAO as e:
+                    ultimo_erro = e
+                    if conn is not None:
+                        self._descartar(conn)
+                    logging.warning(f"Conexão com RabbitMQ perdida ao publicar {routing_key}, reconectando: {e}")
+        raise ultimo_erro
+
+    def fechar(self):
+        with self._todas_lock:
+            conexoes = list(self._todas)
+            self._todas.clear()
+        for conn in conexoes:
+            try:
+                conn.close()
+            except Exception:
+                pass
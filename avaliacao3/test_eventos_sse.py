@@ -0,0 +1,121 @@
+import unittest
+from eventos_sse import FilaSSE, HistoricoEventos, reenviar
+
+
+def frames(fila):
+    corpo = b""
+    while True:
+        parte = fila.retirar_nowait()
+        if parte is None:
+            return corpo
+        corpo += parte
+
+
+class TestReenvio(unittest.TestCase):
+    def test_reconexao_seguida_de_interesse_nao_duplica(self):
+        historico = HistoricoEventos()
+        inicio = historico._ultimo_id
+        historico.registrar("L1", "lance_validado", {"leilao": "L1", "valor": 10})
+        historico.registrar("L1", "leilao_vencedor", {"leilao": "L1", "vencedor": "C1"})
+
+        fila = FilaSSE()
+        fila.retomar_de = inicio
+        with historico.lock:
+            reenviar(historico, fila, {"L1", None})
+        # cliente.html repete o POST /interesse depois de conectar e a cada lance
+        with historico.lock:
+            reenviar(historico, fila, ["L1"])
+            reenviar(historico, fila, ["L1"])
+
+        corpo = frames(fila)
+        self.assertEqual(corpo.count(b"event: leilao_vencedor"), 1)
+        self.assertEqual(corpo.count(b"event: lance_validado"), 1)
+
+    def test_interesse_novo_depois_da_reconexao_reenvia_uma_vez(self):
+        historico = HistoricoEventos()
+        inicio = historico._ultimo_id
+        historico.registrar("L2", "leilao_vencedor", {"leilao": "L2", "vencedor": "C1"})
+
+        fila = FilaSSE()
+        fila.retomar_de = inicio
+        reenviar(historico, fila, {None})
+        reenviar(historico, fila, ["L2"])
+        reenviar(historico, fila, ["L2"])
+        self.assertEqual(frames(fila).count(b"event: leilao_vencedor"), 1)
+
+    def test_reconexao_com_binding_mantido_recebe_o_que_perdeu(self):
+        historico = HistoricoEventos()
+        historico.vinculado("L1")
+        visto, _ = historico.registrar("L1", "lance_validado", {"leilao": "L1", "valor": 10})
+        # stream caiu; o binding fica durante TEMPO_GRACA e o evento entra no histórico
+        historico.registrar("L1", "leilao_vencedor", {"leilao": "L1", "vencedor": "C1"})
+
+        fila = FilaSSE()
+        fila.retomar_de = visto
+        reenviar(historico, fila, {"L1", None})
+        corpo = frames(fila)
+        self.assertEqual(corpo.count(b"event: leilao_vencedor"), 1)
+        self.assertNotIn(b"event: resync", corpo)
+
+    def test_reconexao_depois_do_unbind_pede_resync(self):
+        historico = HistoricoEventos()
+        historico.vinculado("L1")
+        visto, _ = historico.registrar("L1", "lance_validado", {"leilao": "L1", "valor": 10})
+        historico.desvinculado("L1")
+        # eventos publicados sem binding não chegam ao gateway
+        historico.vinculado("L1")
+
+        fila = FilaSSE()
+        fila.retomar_de = visto
+        reenviar(historico, fila, {"L1", None})
+        self.assertIn(b"event: resync", frames(fila))
+
+    def test_evento_durante_o_bind_vai_so_no_reenvio(self):
+        historico = HistoricoEventos()
+        fila = FilaSSE()
+        fila.retomar_de = historico._ultimo_id
+        reenviar(historico, fila, {None})
+        # POST /interesse registrou L1 e espera o bind; chega um evento
+        historico.vinculado("L1")
+        historico.registrar("L1", "leilao_vencedor", {"leilao": "L1", "vencedor": "C1"})
+        self.assertTrue(fila.aguarda_reenvio("L1"))
+        reenviar(historico, fila, ["L1"])
+        self.assertFalse(fila.aguarda_reenvio("L1"))
+        corpo = frames(fila)
+        self.assertEqual(corpo.count(b"event: leilao_vencedor"), 1)
+        self.assertIn(b"event: resync", corpo)     # o que houve antes do bind não chegou ao gateway
+
+
+class TestHistorico(unittest.TestCase):
+    def test_um_evento_por_leilao_fica_no_buffer(self):
+        historico = HistoricoEventos(max_por_leilao=1)
+        inicio = historico._ultimo_id
+        historico.registrar("L1", "lance_validado", {"valor": 1})
+        id_evento, _ = historico.registrar("L1", "lance_validado", {"valor": 2})
+        eventos, lacuna = historico.desde(["L1"], inicio)
+        self.assertEqual([e[1] for e in eventos], [id_evento])
+        self.assertTrue(lacuna)
+
+    def test_marcas_de_descarte_nao_crescem_com_leiloes_antigos(self):
+        historico = HistoricoEventos(max_bytes=1)
+        inicio = historico._ultimo_id
+        for i in range(1000):
+            historico.registrar(f"L{i}", "leilao_vencedor", {"leilao": f"L{i}"})
+        self.assertLessEqual(len(historico._descartado_ate), len(historico._por_leilao))
+        self.assertLessEqual(len(historico._por_leilao), 1)
+        _, lacuna = historico.desde(["L0"], inicio)
+        self.assertTrue(lacuna)
+
+    def test_unbind_sem_eventos_nao_deixa_buffer(self):
+        historico = HistoricoEventos()
+        inicio = historico._ultimo_id
+        historico.vinculado("L1")
+        historico.desvinculado("L1")
+        self.assertEqual(historico._por_leilao, {})
+        self.assertEqual(historico._descartado_ate, {})
+        _, lacuna = historico.desde(["L1"], inicio)
+        self.assertTrue(lacuna)
+
+
+if __name__ == "__main__":
+    unittest.main()
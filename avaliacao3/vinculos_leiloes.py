@@ -0,0 +1,108 @@
+import logging
+import threading
+import pika
+from publicador import rota_leilao
+
+TEMPO_RETRY = 1.0   # segundos até tentar de novo um bind/unbind que falhou
+TEMPO_ESPERA = 5.0  # segundos que esperar() aguarda o bind
+
+
+class VinculosLeiloes:
+    # Bindings leilao_<id> da fila exclusiva de um gateway, acompanhando o
+    # índice de interesses: o primeiro cliente interessado num leilão cria o
+    # binding e o último a sair o remove. Assim cada instância do gateway só
+    # recebe do broker os eventos dos leilões dos seus clientes, e mais
+    # instâncias dividem o fan-out em vez de repeti-lo.
+    # A conexão pika só pode ser usada pela thread do consumidor: as outras
+    # threads pedem a mudança com add_callback_threadsafe, e o callback confere
+    # o estado atual do índice, então pedidos fora de ordem convergem.
+    # Com historico, cada bind/unbind é avisado ao HistoricoEventos, que marca
+    # o intervalo sem binding como lacuna para quem retoma com Last-Event-ID.
+    def __init__(self, exchange, interesses, historico=None):
+        self.exchange = exchange
+        self.interesses = interesses
+        self.historico = historico
+        self._conn = None
+        self._ch = None
+        self._fila = None
+        self._vinculados = set()    # só alterado na thread do consumidor
+        self._esperando = {}        # leilao -> [Event] de quem aguarda o bind (thread do consumidor)
+
+    def iniciar(self, conn, ch, fila):
+        # thread do consumidor, antes de começar a consumir; a conexão é publicada
+        # antes de ler o índice para que nenhum registro concorrente se perca
+        self._vinculados = set()
+        self._conn, self._ch, self._fila = conn, ch, fila
+        for leilao in self.interesses.leiloes():
+            self._aplicar(leilao)
+
+    def mudou(self, leilao):
+        # qualquer thread
+        conn = self._conn
+        if conn is None:
+            return      # consumidor ainda não subiu: iniciar() faz o bind do que existir
+        try:
+            conn.add_callback_threadsafe(lambda: self._aplicar(leilao))
+        except Exception as e:
+            logging.warning(f"Não foi possível atualizar o binding do leilão {leilao}: {e}")
+
+    def esperar(self, leilao, timeout=TEMPO_ESPERA):
+        # Qualquer thread, depois de registrar o interesse. Só volta depois do
+        # bind (True) ou do timeout (False), como o ConsumidorCliente.vincular
+        # da avaliacao1: um evento publicado logo depois do POST /interesse
+        # não pode chegar antes do binding
+        if leilao in self._vinculados:
+            return True
+        conn = self._conn
+        if conn is None:
+            return False
+        feito = threading.Event()
+
+        def conferir():
+            # enfileirado depois do _aplicar pedido pelo registro: se o bind
+            # falhou, quem libera é a nova tentativa
+            if leilao in self._vinculados or leilao not in self.interesses:
+                feito.set()
+            else:
+                self._esperando.setdefault(leilao, []).append(feito)
+
+        try:
+            conn.add_callback_threadsafe(conferir)
+        except Exception as e:
+            logging.warning(f"Não foi possível aguardar o binding do leilão {leilao}: {e}")
+            return False
+        return feito.wait(timeout)
+
+    def _aplicar(self, leilao):
+        # roda dentro do process_data_events do consumidor: um erro do pika aqui
+        # não pode escapar, senão encerra o loop. _vinculados só muda depois do
+        # bind/unbind, então uma falha é tentada de novo em TEMPO_RETRY segundos
+        # (ou na próxima mudança do leilão, ou no iniciar() de uma reconexão)
+        try:
+            self._sincronizar(leilao)
+        except pika.exceptions.AMQPError as e:
+            logging.warning(f"Falha ao atualizar o binding do leilão {leilao}: {e!r}")
+            if self._conn is not None and self._conn.is_open and self._ch.is_open:
+                self._conn.call_later(TEMPO_RETRY, lambda: self._aplicar(leilao))
+
+    def _sincronizar(self, leilao):
+        ativo = leilao in self.interesses
+        if ativo and leilao not in self._vinculados:
+            self._ch.queue_bind(exchange=self.exchange, queue=self._fila, routing_key=rota_leilao(leilao))
+            self._vinculados.add(leilao)
+            if self.historico is not None:
+                self.historico.vinculado(leilao)
+            for feito in self._esperando.pop(leilao, ()):
+                feito.set()
+            logging.info(f"Bind {rota_leilao(leilao)} ({len(self._vinculados)} leilões)")
+        elif not ativo and leilao in self._vinculados:
+            self._ch.queue_unbind(exchange=self.exchange, queue=self._fila, routing_key=rota_leilao(leilao))
+            self._vinculados.discard(leilao)
+            if self.historico is not None:
+                self.historico.desvinculado(leilao)
+            for feito in self._esperando.pop(leilao, ()):
+                feito.set()     # interesse cancelado antes do bind: nada a esperar
+            logging.info(f"Unbind {rota_leilao(leilao)} ({len(self._vinculados)} leilões)")
+
+    def __len__(self):
+        return len(self._vinculados)